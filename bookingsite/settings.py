@@ -46,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'travel.middleware.MetricsMiddleware',
+    'travel.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,7 +64,7 @@ CORS_ALLOWED_ORIGINS = [
 ]
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'rest_framework_simplejwt.authentication.JWTStatelessUserAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -72,9 +74,61 @@ REST_FRAMEWORK = {
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    # Role flags travel inside the token, so API requests never load the User row.
+    'TOKEN_USER_CLASS': 'travel.authentication.ClaimsUser',
 }
 
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# cached_db serves session reads from the cache; set SESSION_ENGINE=django.contrib.sessions.backends.signed_cookies
+# to keep sessions off the server entirely.
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+
+# The listing cache must be shared by every worker process, otherwise a booking in one worker
+# can't invalidate listings cached by another. Point CACHE_BACKEND at redis/memcached in production.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', str(BASE_DIR / '.cache')),
+    }
+}
+LISTING_CACHE_ALIAS = 'default'
+LISTING_CACHE_TIMEOUT = 300
+
+# Full-text search backend. DatabaseSearchBackend is an unindexed fallback for databases without SQLite FTS5.
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'travel.search.SQLiteFTSBackend')
+
+# Post-commit work (search sync, thumbnails, confirmation emails) is queued in the Task table and run by
+# `manage.py run_tasks`. TASKS_EAGER=1 runs it inline instead, for development without a worker.
+TASKS_EAGER = os.environ.get('TASKS_EAGER') == '1'
+
+# Minutes a hold from /api/holds/ keeps its inventory before `manage.py release_holds` returns it.
+HOLD_TTL_MINUTES = int(os.environ.get('HOLD_TTL_MINUTES', 15))
+
+# Bookings record an unpaid Payment; `manage.py settle_payments` captures them through this gateway.
+PAYMENT_GATEWAY = os.environ.get('PAYMENT_GATEWAY', 'travel.payments.StubGateway')
+
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'bookings@bookingsite.local')
+
+# Request metrics are served at /metrics to staff users and to these addresses, e.g. "127.0.0.1,::1".
+# None by default: behind a reverse proxy on the same host every request arrives from 127.0.0.1.
+METRICS_ALLOWED_IPS = [ip for ip in os.environ.get('METRICS_ALLOWED_IPS', '').split(',') if ip]
+METRICS_SLOW_REQUEST_MS = int(os.environ.get('METRICS_SLOW_REQUEST_MS', 500))
+METRICS_LOG_REQUESTS = os.environ.get('METRICS_LOG_REQUESTS') == '1'
+# Every worker process writes its totals here so /metrics can add them up. A worker removes its file when it
+# exits, and files left by workers that died without doing so are removed the next time /metrics is read.
+# Set METRICS_DIR to an empty string to report only the process that serves /metrics.
+METRICS_DIR = os.environ.get('METRICS_DIR', str(BASE_DIR / '.metrics'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'travel': {'handlers': ['console'], 'level': os.environ.get('TRAVEL_LOG_LEVEL', 'INFO')},
+    },
+}
 
 ROOT_URLCONF = 'bookingsite.urls'
 
@@ -100,13 +154,50 @@ WSGI_APPLICATION = 'bookingsite.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# DATABASE_PROFILE=production switches SQLite to WAL (readers never block the writer), keeps connections
+# open across requests and sizes the page cache for a long-lived process. `manage.py load_test` compares them.
+SQLITE_PROFILES = {
+    'default': {'CONN_MAX_AGE': 0, 'PRAGMAS': {}},
+    'production': {
+        'CONN_MAX_AGE': 600,
+        'PRAGMAS': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'cache_size': -64000,
+            'mmap_size': 268435456,
+            'temp_store': 'MEMORY',
+        },
+    },
+}
+DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE', 'default')
+SQLITE_PRAGMAS = SQLITE_PROFILES[DATABASE_PROFILE]['PRAGMAS']
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': SQLITE_PROFILES[DATABASE_PROFILE]['CONN_MAX_AGE'],
+        'CONN_HEALTH_CHECKS': True,
+        # Seconds a connection waits on another writer's lock before raising "database is locked".
+        'OPTIONS': {'timeout': 20},
+        # A file rather than the in-memory default, so threaded booking tests see SQLite's real locking.
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
+# Read replicas: DATABASE_REPLICAS is a comma-separated list of SQLite files kept in step with the primary by
+# `manage.py sync_replicas`. Safe-method requests read from them; a client that has just written reads from
+# the primary for REPLICA_STICKY_SECONDS, which should cover the sync interval. API users are tracked in the
+# default cache, which must be shared by every worker for that.
+for number, replica in enumerate(filter(None, os.environ.get('DATABASE_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'NAME': replica.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['travel.routers.PrimaryReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -1,25 +1,65 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR
 from .models import *
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 
-class HotelReservationInline(admin.TabularInline):
-    model = HotelReservation
+from .pagination import CappedCountPaginator
+
+class CappedCountMixin:
+    """For changelists of tables that grow without bound: counting stops near EXACT_COUNT_LIMIT."""
+    paginator = CappedCountPaginator
+    show_full_result_count = False
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        return self.paginator(queryset, per_page, orphans, allow_empty_first_page, request.GET.get(PAGE_VAR))
+
+class ReservationInline(admin.TabularInline):
+    """A user's most recent reservations. Bookings are created through the booking flow, which keeps seats and
+    slots in step, so the inline only edits and deletes them."""
     extra = 0
     can_delete = True
     show_change_link = True
+    max_rows = 20
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if self.parent_object_id is None:
+            return qs.none()
+        latest = qs.filter(user_id=self.parent_object_id).order_by('-reservation_date').values('pk')[:self.max_rows]
+        return qs.filter(pk__in=latest).select_related('user').order_by('-reservation_date')
+
+    def get_formset(self, request, obj=None, **kwargs):
+        self.parent_object_id = obj.id if obj else None
+        return super().get_formset(request, obj, **kwargs)
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+class HotelReservationInline(ReservationInline):
+    model = HotelReservation
+    verbose_name_plural = 'Latest hotel reservations'
+    readonly_fields = ('room',)
 
-class FlightReservationInline(admin.TabularInline):
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('room__hotel', 'room__room_type')
+
+class FlightReservationInline(ReservationInline):
     model = FlightReservation
-    extra = 0
-    can_delete = True
-    show_change_link = True
+    verbose_name_plural = 'Latest flight reservations'
+    readonly_fields = ('flight',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('flight')
 
-class TourReservationInline(admin.TabularInline):
+class TourReservationInline(ReservationInline):
     model = TourReservation
-    extra = 0
-    can_delete = True
-    show_change_link = True
+    verbose_name_plural = 'Latest tour reservations'
+    readonly_fields = ('tour',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('tour')
 
 class AmenityAdmin(admin.ModelAdmin):
     list_display = ('name', 'icon_class')
@@ -36,52 +76,49 @@ class RoomInline(admin.TabularInline):
     fk_name = 'hotel' 
     show_change_link = True
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('hotel', 'room_type')
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        if db_field.name == 'room_type':
+            # Room types are a short lookup list; load it once per formset rather than once per room row.
+            formfield.choices = list(formfield.choices)
+        return formfield
+
 class ReviewInline(admin.TabularInline):
+    """The newest reviews of the object being edited. Reviews are the customers' own words, so staff can read and
+    delete them but not add or edit them."""
     model = Review
     extra = 0
     fields = ('user', 'rating', 'comment', 'created_at')
-    readonly_fields = ('user', 'rating', 'comment', 'created_at')
-    can_delete = True
+    readonly_fields = fields
+    verbose_name_plural = 'Latest reviews'
+    max_rows = 20
 
     def get_queryset(self, request):
         qs = super().get_queryset(request)
-        if self.parent_object_id:
-            return qs.filter(room__hotel__id=self.parent_object_id, review_type='HOTEL').order_by('-created_at')
-        return qs.none()
-    
-    def get_formset(self, request, obj=None, **kwargs):
-        self.parent_object_id = obj.id if obj else None
-        return super().get_formset(request, obj, **kwargs)
-    
-class HotelReviewInline(admin.TabularInline):
-    model = Review
-    extra = 0
-    fields = ('user', 'review_type', 'rating', 'comment', 'created_at')  # اضافه کردن created_at به fields
-    readonly_fields = ('created_at',)
-
-    def get_queryset(self, request):
-        qs = super().get_queryset(request)
-        if self.parent_object_id:
-            return qs.filter(room__hotel__id=self.parent_object_id, review_type='HOTEL').order_by('-created_at')
-        return qs.none()
+        if self.parent_object_id is None:
+            return qs.none()
+        latest = qs.filter(
+            **{self.fk_name: self.parent_object_id}, review_type=self.review_type,
+        ).order_by('-created_at').values('pk')[:self.max_rows]
+        return qs.filter(pk__in=latest).select_related('user').order_by('-created_at')
 
     def get_formset(self, request, obj=None, **kwargs):
         self.parent_object_id = obj.id if obj else None
         return super().get_formset(request, obj, **kwargs)
-    
-class FlightReviewInline(admin.TabularInline):
-    model = Review
-    extra = 0
 
-    def get_queryset(self, request):
-        qs = super().get_queryset(request)
-        if self.parent_object_id:
-            return qs.filter(flight__id=self.parent_object_id, review_type='FLIGHT')
-        return qs.none()
+    def has_add_permission(self, request, obj=None):
+        return False
 
-    def get_formset(self, request, obj=None, **kwargs):
-        self.parent_object_id = obj.id if obj else None
-        return super().get_formset(request, obj, **kwargs)
+class HotelReviewInline(ReviewInline):
+    fk_name = 'room'
+    review_type = 'HOTEL'
+
+class FlightReviewInline(ReviewInline):
+    fk_name = 'flight'
+    review_type = 'FLIGHT'
 
 class RoomAdmin(admin.ModelAdmin):
     list_display = ('room_number', 'hotel', 'room_type', 'price_per_night', 'capacity', 'is_available')
@@ -99,14 +136,20 @@ class RoomAdmin(admin.ModelAdmin):
             'fields': ('is_available',)
         }),
     )
+    autocomplete_fields = ('hotel',)
     inlines = [HotelReviewInline]
+
+    def get_queryset(self, request):
+        # Room.__str__ reads both, and autocomplete results render it as well as the changelist.
+        return super().get_queryset(request).select_related('hotel', 'room_type')
 admin.site.register(Room, RoomAdmin)
 
 @admin.register(Hotel)
 class HotelAdmin(admin.ModelAdmin):
-    list_display = ('name', 'location_city', 'star_rating', 'contact_email')
+    list_display = ('name', 'location_city', 'star_rating', 'room_count', 'min_price', 'max_price', 'contact_email')
     list_filter = ('star_rating', 'location_city')
     search_fields = ('name', 'location_city', 'contact_email')
+    autocomplete_fields = ('manager',)
     inlines = [RoomInline]
 
     fieldsets = (
@@ -122,38 +165,48 @@ class HotelAdmin(admin.ModelAdmin):
     )
 
 @admin.register(HotelReservation)
-class HotelReservationAdmin(admin.ModelAdmin):
+class HotelReservationAdmin(CappedCountMixin, admin.ModelAdmin):
     list_display = ('user', 'room', 'reservation_date', 'payment_status')
     list_filter = ('payment_status',)
     search_fields = ('user__username', 'user__email', 'room__room_number', )
     date_hierarchy = 'reservation_date'
+    list_select_related = ('user', 'room__hotel', 'room__room_type')
+    autocomplete_fields = ('user', 'room')
 
 @admin.register(FlightReservation)
-class FlightReservationAdmin(admin.ModelAdmin):
+class FlightReservationAdmin(CappedCountMixin, admin.ModelAdmin):
     list_display = ('user', 'flight', 'seat_number', 'reservation_date', 'payment_status')
     list_filter = ('payment_status',)
     search_fields = ('user__username', 'user__email', 'flight__flight_number', 'flight__origin', 'flight__destination')
     date_hierarchy = 'reservation_date'
+    list_select_related = ('user', 'flight')
+    autocomplete_fields = ('user', 'flight')
 
 @admin.register(TourReservation)
-class TourReservationAdmin(admin.ModelAdmin):
+class TourReservationAdmin(CappedCountMixin, admin.ModelAdmin):
     list_display = ('user', 'tour', 'reservation_date', 'payment_status')
     list_filter = ('payment_status',)
     search_fields = ('user__username', 'user__email', 'tour__name')
     date_hierarchy = 'reservation_date'
+    list_select_related = ('user', 'tour')
+    autocomplete_fields = ('user',)
+    raw_id_fields = ('tour',)
 
 
 @admin.register(Review)
-class ReviewAdmin(admin.ModelAdmin):
+class ReviewAdmin(CappedCountMixin, admin.ModelAdmin):
     list_display = ('user', 'review_type', 'rating', 'created_at')
     list_filter = ('rating','review_type')
     search_fields = ('user__email',)
     date_hierarchy = 'created_at'
     ordering = ('-created_at',)
     actions = ['delete_selected']
+    list_select_related = ('user',)
+    autocomplete_fields = ('user', 'room', 'flight')
+    raw_id_fields = ('tour',)
 
 @admin.register(User)
-class CustomUserAdmin(BaseUserAdmin):
+class CustomUserAdmin(CappedCountMixin, BaseUserAdmin):
     inlines = [HotelReservationInline, FlightReservationInline, TourReservationInline]
     add_fieldsets = (
         (None, {
@@ -177,13 +230,36 @@ class FlightAdmin(admin.ModelAdmin):
     list_filter = ('airline', 'origin', 'destination')
     search_fields = ('flight_number', 'origin', 'destination')
     ordering = ('departure_time',)
+    list_select_related = ('airline',)
+    autocomplete_fields = ('airline',)
     inlines = [FlightReviewInline]
 
 
+@admin.register(Airport)
+class AirportAdmin(admin.ModelAdmin):
+    list_display = ('code', 'name', 'city', 'country')
+    search_fields = ('code', 'name', 'city')
+
+
 @admin.register(Airline)
 class AirlineAdmin(admin.ModelAdmin):
     list_display = ('name', 'country', 'contact_number', 'fleet_size')
+    search_fields = ('name', 'country')
 
 admin.site.register(Amenity, AmenityAdmin)
 admin.site.register(RoomType, RoomTypeAdmin)
 
+
+@admin.register(Task)
+class TaskAdmin(CappedCountMixin, admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'run_at', 'finished_at', 'idempotency_key')
+    list_filter = ('status', 'name')
+    search_fields = ('idempotency_key',)
+    readonly_fields = ('created_at', 'finished_at', 'locked_by', 'locked_until', 'last_error')
+    ordering = ('-id',)
+    actions = ['retry']
+
+    @admin.action(description="Retry selected tasks now")
+    def retry(self, request, queryset):
+        queryset.exclude(status=Task.RUNNING).update(status=Task.QUEUED, run_at=timezone.now(), attempts=0)
+
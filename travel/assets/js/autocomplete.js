@@ -0,0 +1,36 @@
+// Wires <input data-autocomplete="hotel|flight|tour"> to the place autocomplete API through a <datalist>.
+(function () {
+    var endpoint = document.currentScript.dataset.endpoint;
+
+    document.querySelectorAll('input[data-autocomplete]').forEach(function (input) {
+        var list = document.createElement('datalist');
+        var timer = null;
+        var last = null;
+        list.id = input.id + '-suggestions';
+        input.setAttribute('list', list.id);
+        input.setAttribute('autocomplete', 'off');
+        input.after(list);
+
+        input.addEventListener('input', function () {
+            clearTimeout(timer);
+            timer = setTimeout(function () {
+                var query = input.value.trim();
+                if (!query || query === last) {
+                    return;
+                }
+                last = query;
+                var url = endpoint + '?scope=' + encodeURIComponent(input.dataset.autocomplete) + '&q=' + encodeURIComponent(query);
+                fetch(url).then(function (response) {
+                    return response.ok ? response.json() : [];
+                }).then(function (places) {
+                    list.replaceChildren.apply(list, places.map(function (place) {
+                        var option = document.createElement('option');
+                        option.value = place.value;
+                        option.label = place.label;
+                        return option;
+                    }));
+                });
+            }, 120);
+        });
+    });
+})();
@@ -0,0 +1,43 @@
+from functools import cached_property
+
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+ROLE_CLAIMS = ('is_staff', 'is_customer', 'is_hotel_manager', 'is_airline_manager')
+
+
+class ClaimsRefreshToken(RefreshToken):
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['username'] = user.username
+        for claim in ROLE_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+
+class ClaimsUser(TokenUser):
+    @cached_property
+    def is_customer(self):
+        return self.token.get('is_customer', False)
+
+    @cached_property
+    def is_hotel_manager(self):
+        return self.token.get('is_hotel_manager', False)
+
+    @cached_property
+    def is_airline_manager(self):
+        return self.token.get('is_airline_manager', False)
+
+
+def token_user_id(request):
+    """The user id in the request's valid Bearer access token, or None. Checks the signature, not the database."""
+    header = request.META.get(api_settings.AUTH_HEADER_NAME, '').split()
+    if len(header) != 2 or header[0] not in api_settings.AUTH_HEADER_TYPES:
+        return None
+    try:
+        return AccessToken(header[1]).get(api_settings.USER_ID_CLAIM)
+    except TokenError:
+        return None
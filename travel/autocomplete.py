@@ -0,0 +1,156 @@
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from heapq import nlargest
+
+from django.db import transaction
+from django.db.models import Count
+
+from . import cache as listing_cache
+from . import routers
+
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+RESULT_CACHE_SIZE = 4096
+
+
+def normalize(text):
+    decomposed = unicodedata.normalize('NFKD', text.strip().casefold())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def scope_sources():
+    from .models import Flight, Hotel, Tour
+    return {
+        'hotel': [(Hotel, 'location_city')],
+        'flight': [(Flight, 'origin'), (Flight, 'destination')],
+        'tour': [(Tour, 'destination')],
+    }
+
+
+def count_places(scope, values=None):
+    counts = {}
+    for model, field in scope_sources()[scope]:
+        rows = model.objects.exclude(**{field: ''})
+        if values is not None:
+            rows = rows.filter(**{f'{field}__in': values})
+        for value, n in rows.order_by().values_list(field).annotate(n=Count('pk')):
+            counts[value] = counts.get(value, 0) + n
+    return counts
+
+
+def airport_aliases():
+    from .models import Airport
+    aliases, labels = {}, {}
+    for code, name, city in Airport.objects.values_list('code', 'name', 'city'):
+        for place in (code, city):
+            aliases.setdefault(place, set()).update({code, name, city})
+        labels[code] = f'{city} ({code})'
+    return aliases, labels
+
+
+class PrefixIndex:
+    """Sorted (key, value) array over normalized place names; a prefix is one bisect plus a short walk."""
+
+    def __init__(self, counts, aliases=None, labels=None):
+        self.lock = threading.Lock()
+        self.aliases = aliases or {}
+        self.labels = labels or {}
+        self.counts = {}
+        self.keys = []
+        # Short prefixes walk most of the array, so answers are memoized until the next write.
+        self.results = {}
+        for value, count in counts.items():
+            self.set(value, count)
+
+    def keys_for(self, value):
+        return {(normalize(name), value) for name in {value, *self.aliases.get(value, ())}}
+
+    def set(self, value, count):
+        with self.lock:
+            self.results.clear()
+            if value in self.counts:
+                for key in self.keys_for(value):
+                    i = bisect_left(self.keys, key)
+                    if i < len(self.keys) and self.keys[i] == key:
+                        del self.keys[i]
+                del self.counts[value]
+            if count > 0:
+                self.counts[value] = count
+                for key in self.keys_for(value):
+                    insort(self.keys, key)
+
+    def label(self, value):
+        return self.labels.get(value, value)
+
+    def complete(self, prefix, limit=DEFAULT_LIMIT):
+        prefix = normalize(prefix)
+        with self.lock:
+            cached = self.results.get((prefix, limit))
+            if cached is not None:
+                return cached
+            matches = set()
+            for i in range(bisect_left(self.keys, (prefix,)), len(self.keys)):
+                key, value = self.keys[i]
+                if not key.startswith(prefix):
+                    break
+                matches.add(value)
+            top = nlargest(limit, matches, key=lambda v: (self.counts[v], v))
+            result = [(value, self.label(value), self.counts[value]) for value in top]
+            if len(self.results) >= RESULT_CACHE_SIZE:
+                self.results.clear()
+            self.results[(prefix, limit)] = result
+            return result
+
+
+class PlaceIndexes:
+    """Per-process indexes, rebuilt when another process bumps the scope's shared version."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.indexes = {}
+        self.versions = {}
+
+    def namespace(self, scope):
+        return f'places:{scope}'
+
+    def get(self, scope):
+        version = listing_cache.current_version(self.namespace(scope))
+        with self.lock:
+            if scope in self.indexes and self.versions[scope] == version:
+                return self.indexes[scope]
+        # The index outlives this version, so it must not be built from a replica that lags behind it.
+        with routers.reading_from_replicas(False):
+            index = PrefixIndex(count_places(scope), *(airport_aliases() if scope == 'flight' else ()))
+        with self.lock:
+            self.indexes[scope], self.versions[scope] = index, version
+        return index
+
+    def refresh(self, scope, values):
+        values = {value for value in values if value}
+        counts = count_places(scope, values) if values else {}
+        versions = listing_cache.bump(self.namespace(scope))
+        with self.lock:
+            index = self.indexes.get(scope)
+            if index is None:
+                return
+            for value in values:
+                index.set(value, counts.get(value, 0))
+            self.versions[scope] = versions[self.namespace(scope)]
+
+    def invalidate(self, scope):
+        listing_cache.bump(self.namespace(scope))
+
+
+places = PlaceIndexes()
+
+
+def complete(scope, prefix, limit=DEFAULT_LIMIT):
+    if not prefix.strip():
+        return []
+    return places.get(scope).complete(prefix, limit)
+
+
+def refresh_on_commit(scope, values):
+    values = set(values)
+    transaction.on_commit(lambda: places.refresh(scope, values))
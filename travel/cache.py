@@ -0,0 +1,103 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+from . import routers
+
+NAMESPACES = ('hotel', 'flight', 'tour')
+IGNORED_PARAMS = {'csrfmiddlewaretoken'}
+MISSING = object()
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def get_cache():
+    return caches[getattr(settings, 'LISTING_CACHE_ALIAS', 'default')]
+
+
+def _record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+def version_key(namespace):
+    return f'listing:{namespace}:version'
+
+
+def current_version(namespace):
+    cache = get_cache()
+    version = cache.get(version_key(namespace))
+    if version is None:
+        cache.add(version_key(namespace), time.time_ns())
+        version = cache.get(version_key(namespace))
+    return version
+
+
+def bump(*namespaces):
+    # A fresh timestamp rather than incr(): concurrent bumps can't collapse into one version.
+    versions = {namespace: time.time_ns() for namespace in namespaces}
+    get_cache().set_many({version_key(namespace): version for namespace, version in versions.items()}, timeout=None)
+    return versions
+
+
+def cache_key(namespace, version, label, params):
+    items = sorted(
+        (key, value.strip())
+        for key, values in params.lists() if key not in IGNORED_PARAMS
+        for value in values if value.strip()
+    )
+    digest = hashlib.md5(repr((label, items)).encode()).hexdigest()
+    return f'listing:{namespace}:{version}:{digest}'
+
+
+def get_or_compute(namespace, label, params, compute):
+    # Read the version before querying, so data read ahead of a commit lands under the old version.
+    cache = get_cache()
+    version = current_version(namespace)
+    key = cache_key(namespace, version, label, params)
+    value = cache.get(key, MISSING)
+    if value is not MISSING:
+        _record('hits')
+        return value
+    _record('misses')
+    value = compute()
+    # A replica may not have caught up with the write that produced this version yet.
+    if value is not MISSING and not (isinstance(version, int) and routers.may_lag(version)):
+        cache.set(key, value, getattr(settings, 'LISTING_CACHE_TIMEOUT', 300))
+    return value
+
+
+class CachedResponseMixin:
+    cache_namespace = None
+
+    def cached(self, handler, request, *args, **kwargs):
+        response = None
+
+        def compute():
+            nonlocal response
+            response = handler(request, *args, **kwargs)
+            return response.data if response.status_code == 200 else MISSING
+
+        # Bodies hold absolute URLs (pagination links, images), so the key includes scheme and host.
+        label = request.build_absolute_uri(request.path)
+        data = get_or_compute(self.cache_namespace, label, request.query_params, compute)
+        if response is not None:
+            return response
+        return Response(data)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached(super().retrieve, request, *args, **kwargs)
+
@@ -0,0 +1,125 @@
+from django.db.models import FileField, ManyToManyField
+from rest_framework import serializers
+from rest_framework.relations import PKOnlyObject
+from rest_framework.response import Response
+
+
+def flat_plan(serializer, prefix=''):
+    model = serializer.Meta.model
+    plan = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if field.source == '*' or '.' in field.source or isinstance(field, serializers.SerializerMethodField):
+            return None
+        lookup = f'{prefix}{field.source}'
+        if isinstance(field, serializers.ListSerializer):
+            many = ManyPlan.for_field(model, field) if not prefix else None
+            if many is None:
+                return None
+            plan.append((name, 'pk', many))
+            continue
+        if isinstance(field, serializers.ManyRelatedField):
+            return None
+        if isinstance(field, serializers.BaseSerializer):
+            child = flat_plan(field, f'{lookup}__')
+            if child is None:
+                return None
+            plan.append((name, lookup, child))
+        elif isinstance(field, serializers.RelatedField):
+            if not isinstance(field, serializers.PrimaryKeyRelatedField):
+                return None
+            plan.append((name, lookup, lambda value, field=field: field.to_representation(PKOnlyObject(value))))
+        else:
+            model_field = model._meta.get_field(field.source)
+            if isinstance(model_field, FileField):
+                to_value = lambda value, field=field, model_field=model_field: field.to_representation(
+                    model_field.attr_class(None, model_field, value) if value else None
+                )
+            else:
+                to_value = field.to_representation
+            plan.append((name, lookup, to_value))
+    return plan
+
+
+class ManyPlan:
+    """A many=True nested serializer over a ManyToManyField, loaded with one query on the through table."""
+
+    def __init__(self, model_field, plan):
+        self.through = model_field.remote_field.through
+        self.source = f'{model_field.m2m_field_name()}_id'
+        self.target = model_field.m2m_reverse_field_name()
+        self.ordering = [
+            f"{'-' if order.startswith('-') else ''}{self.target}__{order.lstrip('-')}"
+            for order in model_field.related_model._meta.ordering or ['pk']
+        ]
+        self.plan = plan
+
+    @classmethod
+    def for_field(cls, model, field):
+        model_field = model._meta.get_field(field.source)
+        if not isinstance(model_field, ManyToManyField) or not isinstance(field.child, serializers.ModelSerializer):
+            return None
+        plan = flat_plan(field.child, f'{model_field.m2m_reverse_field_name()}__')
+        return None if plan is None else cls(model_field, plan)
+
+    def load(self, ids):
+        related = {}
+        if not ids:
+            return related
+        rows = self.through.objects.filter(**{f'{self.source}__in': ids}).order_by(self.source, *self.ordering)
+        for row in rows.values(self.source, *plan_lookups(self.plan)):
+            related.setdefault(row[self.source], []).append(build_row(self.plan, row))
+        return related
+
+
+def plan_lookups(plan):
+    lookups = []
+    for _, lookup, value in plan:
+        lookups.append(lookup)
+        if isinstance(value, list):
+            lookups.extend(plan_lookups(value))
+    return lookups
+
+
+def build_rows(plan, rows):
+    rows = list(rows)
+    many = {name: value.load([row['pk'] for row in rows]) for name, _, value in plan if isinstance(value, ManyPlan)}
+    return [build_row(plan, row, many) for row in rows]
+
+
+def build_row(plan, row, many=None):
+    data = {}
+    for name, lookup, value in plan:
+        if isinstance(value, ManyPlan):
+            data[name] = many[name].get(row[lookup], [])
+        elif isinstance(value, list):
+            data[name] = None if row[lookup] is None else build_row(value, row)
+        else:
+            raw = row[lookup]
+            data[name] = None if raw is None else value(raw)
+    return data
+
+
+def flat_rows(queryset, serializer, extra_lookups=()):
+    plan = flat_plan(serializer)
+    if plan is None:
+        return None
+    lookups = list(dict.fromkeys(plan_lookups(plan) + list(extra_lookups)))
+    return plan, queryset.prefetch_related(None).values(*lookups)
+
+
+class FlatListMixin:
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer()
+        extra = [field.lstrip('-') for field in self.get_keyset_ordering()] if hasattr(self, 'get_keyset_ordering') else []
+        flat = flat_rows(self.filter_queryset(self.get_queryset()), serializer, extra)
+        if flat is None:
+            return super().list(request, *args, **kwargs)
+
+        plan, rows = flat
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(build_rows(plan, page))
+        return Response(build_rows(plan, rows))
+
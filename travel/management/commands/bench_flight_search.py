@@ -0,0 +1,91 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from travel.models import Airline, Airport, Flight
+
+BENCH_PREFIX = 'BENCH-'
+CITIES = [
+    ('IKA', 'Tehran'), ('MHD', 'Mashhad'), ('SYZ', 'Shiraz'), ('IFN', 'Isfahan'), ('TBZ', 'Tabriz'),
+    ('IST', 'Istanbul'), ('DXB', 'Dubai'), ('CDG', 'Paris'), ('LHR', 'London'), ('FRA', 'Frankfurt'),
+    ('DOH', 'Doha'), ('AMS', 'Amsterdam'), ('FCO', 'Rome'), ('MAD', 'Madrid'), ('VIE', 'Vienna'),
+]
+
+
+class Command(BaseCommand):
+    help = "Seed benchmark flights and compare the icontains search against the indexed route search."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--cleanup', action='store_true', help="Delete the seeded flights afterwards.")
+
+    def handle(self, *args, **options):
+        self.seed(options['rows'], options['batch_size'])
+
+        day = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=30)
+        old = (
+            Flight.objects.filter(origin__icontains='tehran', destination__icontains='paris')
+            .order_by('departure_time')[:5]
+        )
+        places = lambda term: Airport.objects.places_for(term) | {term.title()}
+        new = (
+            Flight.objects.filter(
+                Q(origin__in=places('tehran')), Q(destination__in=places('paris')),
+                departure_time__gte=day, departure_time__lt=day + timedelta(days=7),
+            )
+            .order_by('departure_time')[:5]
+        )
+        for label, queryset in (('icontains', old), ('indexed', new)):
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(self.explain(queryset))
+            self.stdout.write(f"  {self.timeit(queryset, options['repeat']) * 1000:.2f} ms/query")
+
+        if options['cleanup']:
+            Flight.objects.filter(flight_number__startswith=BENCH_PREFIX).delete()
+
+    def seed(self, rows, batch_size):
+        for code, city in CITIES:
+            Airport.objects.get_or_create(code=code, defaults={'name': f'{city} airport', 'city': city})
+        existing = Flight.objects.filter(flight_number__startswith=BENCH_PREFIX).count()
+        if existing >= rows:
+            return
+        airline, _ = Airline.objects.get_or_create(name='Bench Air', defaults={'country': '-'})
+        now = timezone.now()
+        rng = random.Random(42)
+        started = time.perf_counter()
+        for offset in range(existing, rows, batch_size):
+            batch = []
+            for i in range(offset, min(offset + batch_size, rows)):
+                origin, destination = rng.sample(CITIES, 2)
+                departure = now + timedelta(minutes=rng.randrange(365 * 24 * 60))
+                batch.append(Flight(
+                    flight_number=f'{BENCH_PREFIX}{i}', origin=origin[1], destination=destination[1],
+                    departure_time=departure, arrival_time=departure + timedelta(hours=3),
+                    airline=airline, seat_count=180, available_seats=rng.randrange(181),
+                    price=rng.randrange(50, 1500),
+                ))
+            with transaction.atomic():
+                Flight.objects.bulk_create(batch)
+        self.stdout.write(f"Seeded {rows - existing} flights in {time.perf_counter() - started:.1f}s")
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                return '\n'.join(f'  {row[-1]}' for row in cursor.fetchall())
+            cursor.execute(f'EXPLAIN {sql}', params)
+            return '\n'.join(f'  {row[0]}' for row in cursor.fetchall())
+
+    def timeit(self, queryset, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            list(queryset._chain())
+        return (time.perf_counter() - started) / repeat
@@ -0,0 +1,84 @@
+import random
+import statistics
+import time
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from travel import search
+
+# Synthetic documents live far above any real object id so they never resolve to a model row.
+BENCH_ROWID_OFFSET = 10 ** 12
+SYLLABLES = ['ka', 'ri', 'mo', 'ta', 'len', 'sha', 'vi', 'ro', 'dan', 'el', 'pa', 'zu', 'ne', 'bor', 'is', 'fa']
+COMMON_WORDS = ['hotel', 'room', 'view', 'spa', 'wifi', 'pool', 'breakfast', 'tour', 'old', 'town', 'grand', 'palace']
+
+
+def vocabulary(rng, size):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    return sorted(words)
+
+
+class Command(BaseCommand):
+    help = "Seed synthetic documents into the search index and time ranked queries against it."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--documents', type=int, default=1_000_000)
+        parser.add_argument('--batch-size', type=int, default=20_000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--cleanup', action='store_true', help="Delete the synthetic documents afterwards.")
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        if not isinstance(backend, search.SQLiteFTSBackend):
+            raise CommandError("bench_search measures the SQLite FTS5 backend.")
+        rng = random.Random(42)
+        self.words = vocabulary(rng, 20_000)
+        self.places = vocabulary(rng, 500)
+        self.seed(options['documents'], options['batch_size'])
+
+        queries = [
+            rng.choice(self.places), f'{rng.choice(self.words)} {rng.choice(self.places)}', rng.choice(self.words)[:3],
+            'grand palace', 'spa', f'{rng.choice(COMMON_WORDS)} {rng.choice(self.words)}',
+        ]
+        for query in queries:
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                backend.search(query, limit=20)
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f"  {query!r:24} median {statistics.median(timings):.2f} ms, max {max(timings):.2f} ms"
+            )
+
+        if options['cleanup']:
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {search.SEARCH_TABLE} WHERE rowid >= %s", [BENCH_ROWID_OFFSET])
+
+    def seed(self, documents, batch_size):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {search.SEARCH_TABLE} WHERE rowid >= %s", [BENCH_ROWID_OFFSET])
+            existing = cursor.fetchone()[0]
+        if existing >= documents:
+            return
+        rng = random.Random(existing)
+        # Zipf-like: a handful of very common words plus a long tail, as in real listing text.
+        weights = list(accumulate(1 / (rank + 1) for rank in range(len(self.words))))
+        started = time.perf_counter()
+        for offset in range(existing, documents, batch_size):
+            rows = [
+                (
+                    BENCH_ROWID_OFFSET + i,
+                    ' '.join(rng.choices(self.words, cum_weights=weights, k=2)).title(),
+                    ' '.join([*rng.sample(COMMON_WORDS, 2), *rng.choices(self.words, cum_weights=weights, k=10)]),
+                    rng.choice(self.places),
+                )
+                for i in range(offset, min(offset + batch_size, documents))
+            ]
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(
+                    f"INSERT INTO {search.SEARCH_TABLE} (rowid, title, body, place) VALUES (%s, %s, %s, %s)", rows
+                )
+        self.stdout.write(f"Seeded {documents - existing} documents in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,71 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from travel.fast_serializers import build_rows, flat_rows
+from travel.models import Amenity, Hotel, Room, User
+from travel.prefetch import optimize_for_serializer
+from travel.serializers import HotelSerializer, RoomSerializer
+
+
+class Command(BaseCommand):
+    help = "Compare rows/sec of the ModelSerializer list path against the values() fast path."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        self.seed(options['rows'])
+        # Image URLs are built absolute, so the host has to be in ALLOWED_HOSTS.
+        factory = RequestFactory(SERVER_NAME='localhost')
+        sparse_request = Request(factory.get('/api/room/', {'fields': 'id,hotel,room_type,room_number,capacity,price_per_night'}))
+        cases = [
+            ('hotels', Hotel.objects.order_by('id'), HotelSerializer, Request(factory.get('/api/hotel/'))),
+            ('rooms', Room.objects.order_by('id'), RoomSerializer, Request(factory.get('/api/room/'))),
+            ('rooms (sparse)', Room.objects.order_by('id'), RoomSerializer, sparse_request),
+        ]
+        for label, queryset, serializer_class, request in cases:
+            queryset = queryset[:options['rows']]
+            context = {'request': request}
+
+            def serializer_path():
+                return serializer_class(optimize_for_serializer(queryset, serializer_class), many=True, context=context).data
+
+            def fast_path():
+                plan, rows = flat_rows(queryset, serializer_class(context=context))
+                return build_rows(plan, rows)
+
+            slow_rate = self.rate(serializer_path, options['repeat'])
+            fast_rate = self.rate(fast_path, options['repeat'])
+            self.stdout.write(
+                f"{label}: serializer {slow_rate:,.0f} rows/s, fast path {fast_rate:,.0f} rows/s "
+                f"({fast_rate / slow_rate:.1f}x)"
+            )
+
+    def rate(self, func, repeat):
+        rows = 0
+        started = time.perf_counter()
+        for _ in range(repeat):
+            rows += len(func())
+        return rows / (time.perf_counter() - started)
+
+    def seed(self, rows):
+        missing = rows - Room.objects.count()
+        if missing <= 0:
+            return
+        manager, _ = User.objects.get_or_create(username='bench-manager', defaults={'email': 'bench-manager@example.com'})
+        hotels = Hotel.objects.bulk_create(
+            Hotel(name=f'Bench hotel {i}', location_city='Bench', location_address='-', star_rating=3, manager=manager)
+            for i in range(missing)
+        )
+        rooms = Room.objects.bulk_create(
+            Room(hotel=hotel, room_number='1', capacity=2, price_per_night=100) for hotel in hotels
+        )
+        amenities = [Amenity.objects.get_or_create(name=f'Bench amenity {i}')[0] for i in range(3)]
+        Room.amenities.through.objects.bulk_create(
+            Room.amenities.through(room=room, amenity=amenity) for room in rooms for amenity in amenities
+        )
+        Hotel.objects.filter(pk__in=[hotel.pk for hotel in hotels]).refresh_room_aggregates()
@@ -0,0 +1,70 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from travel.models import User
+
+ENGINES = [
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+    'django.contrib.sessions.backends.signed_cookies',
+]
+BENCH_PASSWORD = 'bench-sessions-pw'
+
+
+class Command(BaseCommand):
+    help = "Measure logged-in request latency under concurrency for each session backend."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=16)
+        parser.add_argument('--requests', type=int, default=50, help="Requests per user.")
+        parser.add_argument('--path', default='/profile/')
+        parser.add_argument('--engine', action='append', dest='engines', help="Session engine to test (repeatable).")
+
+    def handle(self, *args, **options):
+        users = []
+        for i in range(options['users']):
+            user, created = User.objects.get_or_create(
+                username=f'bench-session-{i}', defaults={'email': f'bench-session-{i}@example.com'}
+            )
+            if created:
+                user.set_password(BENCH_PASSWORD)
+                user.save()
+            users.append(user)
+
+        for engine in options['engines'] or ENGINES:
+            with override_settings(SESSION_ENGINE=engine):
+                latencies = self.run(users, options['requests'], options['path'])
+            latencies.sort()
+            self.stdout.write(
+                f"{engine.rsplit('.', 1)[-1]:>15}: p50 {statistics.median(latencies) * 1000:.1f} ms, "
+                f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms, "
+                f"{len(latencies) / sum(latencies) * len(users):.0f} req/s"
+            )
+
+    def run(self, users, requests, path):
+        def browse(user):
+            # The test client's default 'testserver' host isn't in ALLOWED_HOSTS outside the test runner.
+            client = Client(HTTP_HOST='localhost')
+            timings = []
+            try:
+                response = client.post(reverse('auth'), {'username': user.username, 'password': BENCH_PASSWORD})
+                if response.status_code != 302 or response.url != reverse('profile'):
+                    raise CommandError(f"{user.username} could not log in: HTTP {response.status_code}")
+                for _ in range(requests):
+                    started = time.perf_counter()
+                    response = client.get(path)
+                    timings.append(time.perf_counter() - started)
+                    if response.status_code != 200:
+                        raise CommandError(f"GET {path} as {user.username} returned HTTP {response.status_code}")
+            finally:
+                connection.close()
+            return timings
+
+        with ThreadPoolExecutor(max_workers=len(users)) as pool:
+            return [latency for timings in pool.map(browse, users) for latency in timings]
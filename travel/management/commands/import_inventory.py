@@ -0,0 +1,213 @@
+import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from travel import autocomplete
+from travel import cache as listing_cache
+from travel import search
+from travel.models import Airline, Airport, Amenity, Flight, Hotel, Room, RoomType, Tour, User
+
+FLIGHT_FIELDS = ['flight_number', 'origin', 'destination', 'departure_time', 'arrival_time',
+                 'seat_count', 'available_seats', 'price', 'seat_layout']
+ROOM_FIELDS = ['room_number', 'capacity', 'price_per_night', 'is_available']
+HOTEL_FIELDS = ['name', 'location_city', 'location_address', 'description', 'star_rating', 'contact_email']
+PLACE_SCOPES = {'hotels': 'hotel', 'flights': 'flight', 'tours': 'tour'}
+TOUR_FIELDS = ['name', 'description', 'destination', 'start_date', 'end_date', 'price',
+               'max_participants', 'available_slots', 'guide_name']
+
+
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8') as handle:
+        if path.suffix == '.jsonl':
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(handle)
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+def convert(model, row, names):
+    values = {}
+    for name in names:
+        raw = row.get(name)
+        if raw in (None, ''):
+            continue
+        field = model._meta.get_field(name)
+        value = field.to_python(raw)
+        if hasattr(value, 'tzinfo') and hasattr(value, 'hour') and timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        values[name] = value
+    return values
+
+
+class Command(BaseCommand):
+    help = "Stream hotels, rooms, flights or tours from CSV/JSONL into the database with bulk upserts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=['hotels', 'rooms', 'flights', 'tours'])
+        parser.add_argument('path', type=Path)
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--create-missing', action='store_true',
+                            help="Create unknown airlines, room types and amenities instead of rejecting the row.")
+        parser.add_argument('--strict', action='store_true', help="Abort on the first invalid row.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not path.exists():
+            raise CommandError(f"{path} does not exist")
+        self.create_missing = options['create_missing']
+        self.load_lookups()
+
+        build, write = getattr(self, f"build_{options['kind']}"), getattr(self, f"write_{options['kind']}")
+        started = time.perf_counter()
+        written = rejected = 0
+        line = 1
+        for chunk in chunked(read_rows(path), options['chunk_size']):
+            objects = []
+            for row in chunk:
+                line += 1
+                try:
+                    objects.append(build(row))
+                except (ValidationError, KeyError, ValueError) as e:
+                    if options['strict']:
+                        raise CommandError(f"Row {line}: {e}")
+                    rejected += 1
+                    self.stderr.write(f"Row {line} skipped: {e}")
+            with transaction.atomic():
+                written += write(objects)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{written} rows written, {rejected} rejected ({written / elapsed:,.0f} rows/s)")
+
+        listing_cache.bump('hotel', 'flight', 'tour')
+        if options['kind'] in PLACE_SCOPES:
+            autocomplete.places.invalidate(PLACE_SCOPES[options['kind']])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {written} {options['kind']} in {elapsed:.1f}s ({written / max(elapsed, 1e-9):,.0f} rows/s), "
+            f"{rejected} rejected"
+        ))
+
+    def load_lookups(self):
+        self.airlines = dict(Airline.objects.values_list('name', 'id'))
+        self.room_types = dict(RoomType.objects.values_list('name', 'id'))
+        self.amenities = dict(Amenity.objects.values_list('name', 'id'))
+        self.places = {}
+        for code, city in Airport.objects.values_list('code', 'city'):
+            self.places[code.lower()] = code
+            self.places[city.lower()] = city
+
+    def lookup(self, table, model, name, **defaults):
+        if name not in table:
+            if not self.create_missing:
+                raise ValidationError(f"Unknown {model._meta.verbose_name} '{name}'")
+            table[name] = model.objects.get_or_create(name=name, defaults=defaults)[0].pk
+        return table[name]
+
+    def validated(self, instance, exclude=()):
+        instance.clean_fields(exclude=list(exclude))
+        return instance
+
+    # Flights: upsert on flight_number.
+    def build_flights(self, row):
+        values = convert(Flight, row, FLIGHT_FIELDS)
+        values.setdefault('available_seats', values.get('seat_count'))
+        for name in ('origin', 'destination'):
+            values[name] = self.places.get(values[name].strip().lower(), values[name].strip())
+        airline_id = self.lookup(self.airlines, Airline, row['airline'], country=row.get('airline_country', ''))
+        return self.validated(Flight(airline_id=airline_id, **values), exclude=['airline', 'seat_map'])
+
+    def write_flights(self, flights):
+        Flight.objects.bulk_create(
+            flights, update_conflicts=True, unique_fields=['flight_number'],
+            # available_seats is owned by bookings once a flight exists, so feeds never overwrite it.
+            update_fields=['origin', 'destination', 'departure_time', 'arrival_time', 'airline',
+                           'seat_count', 'price', 'seat_layout'],
+        )
+        search.sync_on_commit('flight', Flight.objects.filter(
+            flight_number__in=[flight.flight_number for flight in flights]
+        ).values_list('pk', flat=True))
+        return len(flights)
+
+    # Rooms: upsert on (hotel, room_number); amenities are replaced.
+    def build_rooms(self, row):
+        values = convert(Room, row, ROOM_FIELDS)
+        room = Room(hotel_id=int(row['hotel_id']), **values)
+        if row.get('room_type'):
+            room.room_type_id = self.lookup(self.room_types, RoomType, row['room_type'])
+        amenities = row.get('amenities') or []
+        if isinstance(amenities, str):
+            amenities = [name.strip() for name in amenities.split('|') if name.strip()]
+        room._amenity_ids = [self.lookup(self.amenities, Amenity, name) for name in amenities]
+        return self.validated(room, exclude=['hotel', 'room_type'])
+
+    def write_rooms(self, rooms):
+        hotel_ids = {room.hotel_id for room in rooms}
+        known = set(Hotel.objects.filter(pk__in=hotel_ids).values_list('pk', flat=True))
+        missing = hotel_ids - known
+        if missing:
+            self.stderr.write(f"Skipped rooms for unknown hotels {sorted(missing)}")
+            rooms = [room for room in rooms if room.hotel_id in known]
+
+        Room.objects.bulk_create(
+            rooms, update_conflicts=True, unique_fields=['hotel', 'room_number'],
+            update_fields=['room_type', 'capacity', 'price_per_night', 'is_available'],
+        )
+        ids = {
+            (hotel_id, number): pk for pk, hotel_id, number in Room.objects.filter(
+                hotel_id__in=known, room_number__in={room.room_number for room in rooms}
+            ).values_list('pk', 'hotel_id', 'room_number')
+        }
+        through = Room.amenities.through
+        room_ids = [ids[(room.hotel_id, room.room_number)] for room in rooms]
+        through.objects.filter(room_id__in=room_ids).delete()
+        through.objects.bulk_create(
+            through(room_id=room_id, amenity_id=amenity_id)
+            for room, room_id in zip(rooms, room_ids) for amenity_id in room._amenity_ids
+        )
+        Hotel.objects.filter(pk__in=known).refresh_room_aggregates()
+        search.sync_on_commit('hotel', known)
+        return len(rooms)
+
+    # Hotels and tours have no natural key, so they are insert-only.
+    def build_hotels(self, row):
+        values = convert(Hotel, row, HOTEL_FIELDS)
+        hotel = Hotel(**values)
+        hotel._manager_username = row['manager']
+        return self.validated(hotel, exclude=['manager', 'main_image'])
+
+    def write_hotels(self, hotels):
+        managers = dict(User.objects.filter(
+            username__in={hotel._manager_username for hotel in hotels}
+        ).values_list('username', 'id'))
+        unknown = {hotel._manager_username for hotel in hotels} - managers.keys()
+        if unknown:
+            self.stderr.write(f"Skipped hotels for unknown managers {sorted(unknown)}")
+            hotels = [hotel for hotel in hotels if hotel._manager_username in managers]
+        for hotel in hotels:
+            hotel.manager_id = managers[hotel._manager_username]
+        Hotel.objects.bulk_create(hotels)
+        search.sync_on_commit('hotel', [hotel.pk for hotel in hotels])
+        return len(hotels)
+
+    def build_tours(self, row):
+        values = convert(Tour, row, TOUR_FIELDS)
+        values.setdefault('available_slots', values.get('max_participants'))
+        return self.validated(Tour(**values), exclude=['image'])
+
+    def write_tours(self, tours):
+        Tour.objects.bulk_create(tours)
+        search.sync_on_commit('tour', [tour.pk for tour in tours])
+        return len(tours)
@@ -0,0 +1,129 @@
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connections
+
+from travel.models import Hotel, Room, User
+from travel.services import BookingError, book_room
+
+ROOMS = 200
+
+
+def use_database(path, profile):
+    """Point this process at `path` with the profile's connection settings."""
+    connections.close_all()
+    config = settings.SQLITE_PROFILES[profile]
+    settings.SQLITE_PRAGMAS = config['PRAGMAS']
+    for settings_dict in (settings.DATABASES['default'], connections['default'].settings_dict):
+        settings_dict['NAME'] = path
+        settings_dict['CONN_MAX_AGE'] = config['CONN_MAX_AGE']
+
+
+def worker(path, profile, seconds, write_ratio, seed, results):
+    use_database(path, profile)
+    rng = random.Random(seed)
+    user = User.objects.get(username='load-test')
+    room_ids = list(Room.objects.values_list('pk', flat=True))
+    counts = {'reads': 0, 'writes': 0, 'conflicts': 0, 'locked': 0}
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        # What the request cycle does between requests: with CONN_MAX_AGE=0 this reconnects every time.
+        close_old_connections()
+        check_in = date.today() + timedelta(days=rng.randrange(365))
+        try:
+            if rng.random() < write_ratio:
+                book_room(user, rng.choice(room_ids), check_in, check_in + timedelta(days=rng.randint(1, 4)))
+                counts['writes'] += 1
+            else:
+                list(Room.objects.available(check_in, check_in + timedelta(days=2)).select_related('hotel')[:20])
+                counts['reads'] += 1
+        except BookingError:
+            counts['conflicts'] += 1
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            counts['locked'] += 1
+    close_old_connections()
+    connections.close_all()
+    results.put(counts)
+
+
+class Command(BaseCommand):
+    help = "Hammer a scratch copy of the schema with concurrent booking processes under each SQLite profile."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--write-ratio', type=float, default=0.2, help="Share of operations that book a room.")
+        parser.add_argument('--profile', action='append', dest='profiles',
+                            help="Profile from SQLITE_PROFILES to run; repeat for several. Defaults to all.")
+
+    def handle(self, *args, **options):
+        if settings.DATABASES['default']['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError("load_test compares SQLite profiles.")
+        profiles = options['profiles'] or list(settings.SQLITE_PROFILES)
+        unknown = set(profiles) - set(settings.SQLITE_PROFILES)
+        if unknown:
+            raise CommandError(f"Unknown profile(s): {', '.join(sorted(unknown))}")
+
+        original = (dict(settings.DATABASES['default']), settings.SQLITE_PRAGMAS)
+        scratch = tempfile.mkdtemp(prefix='load-test-')
+        try:
+            template = os.path.join(scratch, 'template.sqlite3')
+            self.build_template(template)
+            self.stdout.write(f"{'profile':<12}{'ops/s':>10}{'reads/s':>10}{'writes/s':>10}{'conflicts':>11}{'locked':>8}")
+            for profile in profiles:
+                path = os.path.join(scratch, f'{profile}.sqlite3')
+                shutil.copy(template, path)
+                totals, elapsed = self.run_profile(path, profile, options)
+                ops = totals['reads'] + totals['writes']
+                self.stdout.write(
+                    f"{profile:<12}{ops / elapsed:>10.0f}{totals['reads'] / elapsed:>10.0f}"
+                    f"{totals['writes'] / elapsed:>10.0f}{totals['conflicts']:>11}{totals['locked']:>8}"
+                )
+        finally:
+            connections.close_all()
+            settings.DATABASES['default'].update(original[0])
+            connections['default'].settings_dict.update(original[0])
+            settings.SQLITE_PRAGMAS = original[1]
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    def build_template(self, path):
+        use_database(path, 'default')
+        call_command('migrate', verbosity=0)
+        user = User.objects.create_user('load-test', 'load-test@example.com', 'load-test')
+        hotels = Hotel.objects.bulk_create(
+            Hotel(name=f'Load hotel {i}', location_city='Paris', location_address='-', star_rating=3, manager=user)
+            for i in range(ROOMS // 10)
+        )
+        Room.objects.bulk_create(
+            Room(hotel=hotel, room_number=str(n), capacity=2, price_per_night=100) for hotel in hotels for n in range(10)
+        )
+        connections.close_all()
+
+    def run_profile(self, path, profile, options):
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        processes = [
+            context.Process(
+                target=worker, args=(path, profile, options['seconds'], options['write_ratio'], seed, results),
+            )
+            for seed in range(options['processes'])
+        ]
+        started = time.perf_counter()
+        for process in processes:
+            process.start()
+        counts = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - started
+        totals = {key: sum(count[key] for count in counts) for key in counts[0]}
+        return totals, elapsed
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from travel.models import Hotel
+
+
+class Command(BaseCommand):
+    help = "Recompute Hotel.min_price, max_price and room_count from the rooms table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--hotel', type=int, action='append', dest='hotel_ids', help="Only rebuild these hotels.")
+
+    def handle(self, *args, **options):
+        hotels = Hotel.objects.order_by('pk')
+        if options['hotel_ids']:
+            hotels = hotels.filter(pk__in=options['hotel_ids'])
+
+        started = time.perf_counter()
+        updated = 0
+        last_pk = 0
+        while True:
+            batch = list(hotels.filter(pk__gt=last_pk).values_list('pk', flat=True)[:options['batch_size']])
+            if not batch:
+                break
+            updated += Hotel.objects.filter(pk__in=batch).refresh_room_aggregates()
+            last_pk = batch[-1]
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt aggregates for {updated} hotels in {time.perf_counter() - started:.2f}s"
+        ))
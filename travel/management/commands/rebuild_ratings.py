@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from travel import cache as listing_cache
+from travel.models import Flight, Hotel, Room, Tour
+
+TARGETS = (
+    ('rooms', Room, 'room'),
+    ('hotels', Hotel, 'room__hotel'),
+    ('flights', Flight, 'flight'),
+    ('tours', Tour, 'tour'),
+)
+
+
+class Command(BaseCommand):
+    help = "Recompute review count, average and 1-5 histogram for rooms, hotels, flights and tours."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for label, model, lookup in TARGETS:
+            started = time.perf_counter()
+            updated = 0
+            last_pk = 0
+            while True:
+                batch = list(
+                    model.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:options['batch_size']]
+                )
+                if not batch:
+                    break
+                updated += model.objects.filter(pk__in=batch).rebuild_ratings(lookup)
+                last_pk = batch[-1]
+            self.stdout.write(f"{label}: rebuilt {updated} rows in {time.perf_counter() - started:.2f}s")
+        listing_cache.bump('hotel', 'flight', 'tour')
+        self.stdout.write(self.style.SUCCESS("Rating summaries rebuilt"))
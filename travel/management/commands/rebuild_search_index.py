@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from travel import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for hotels, tours and flights."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', action='append', choices=search.SEARCH_KINDS, dest='kinds',
+                            help="Only rebuild this kind; repeat for several. Defaults to all.")
+
+    def handle(self, *args, **options):
+        search.get_backend().install()
+        for kind in options['kinds'] or search.SEARCH_KINDS:
+            started = time.perf_counter()
+            indexed = search.rebuild(kind)
+            self.stdout.write(f"{kind}: indexed {indexed} documents in {time.perf_counter() - started:.2f}s")
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt"))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from travel import thumbnails
+
+
+class Command(BaseCommand):
+    help = "Generate card thumbnails for hotel and tour images that don't have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', action='append', choices=sorted(thumbnails.image_fields()), dest='kinds',
+                            help="Only process this kind; repeat for several. Defaults to all.")
+        parser.add_argument('--force', action='store_true',
+                            help="Re-render every thumbnail, e.g. after changing THUMBNAIL_SIZES or encoder settings.")
+
+    def handle(self, *args, **options):
+        for kind in options['kinds'] or sorted(thumbnails.image_fields()):
+            model, field = thumbnails.image_fields()[kind]
+            objects = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+            if not options['force']:
+                objects = objects.filter(thumbnail_digest='')
+            started, done, failed = time.perf_counter(), 0, 0
+            for pk in objects.order_by('pk').values_list('pk', flat=True).iterator():
+                if thumbnails.generate(kind, pk, force=options['force']):
+                    done += 1
+                else:
+                    failed += 1
+            self.stdout.write(f"{kind}: {done} thumbnailed, {failed} failed in {time.perf_counter() - started:.2f}s")
+        self.stdout.write(self.style.SUCCESS("Thumbnails rebuilt"))
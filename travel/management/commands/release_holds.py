@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from travel.services import release_expired_holds
+
+
+class Command(BaseCommand):
+    help = "Delete expired booking holds and return their rooms, seats and tour slots to inventory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Holds released per kind per pass.")
+        parser.add_argument('--interval', type=float, default=0,
+                            help="Keep sweeping every this many seconds; 0 drains once and exits.")
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            totals = {'hotel': 0, 'flight': 0, 'tour': 0}
+            while True:
+                released = release_expired_holds(options['batch_size'])
+                for kind, count in released.items():
+                    totals[kind] += count
+                if not any(released.values()):
+                    break
+            if any(totals.values()) or not options['interval']:
+                summary = ', '.join(f"{count} {kind}" for kind, count in totals.items())
+                self.stdout.write(f"Released {summary} holds in {(time.perf_counter() - started) * 1000:.0f} ms")
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
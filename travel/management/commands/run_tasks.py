@@ -0,0 +1,46 @@
+import signal
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from travel import tasks
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks (search sync, thumbnails, confirmation emails) until stopped."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--burst', action='store_true', help="Exit once the queue is empty.")
+        parser.add_argument('--batch', type=int, default=10, help="Tasks claimed per poll.")
+        parser.add_argument('--sleep', type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument('--purge-days', type=int, default=7,
+                            help="Delete finished tasks older than this many days on startup; 0 keeps them.")
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        worker = tasks.worker_id()
+        if options['purge_days']:
+            purged = tasks.purge(timedelta(days=options['purge_days']))
+            self.stdout.write(f"Purged {purged} finished tasks")
+        self.stdout.write(f"Worker {worker} started")
+        done = failed = 0
+        try:
+            while not self.stopping:
+                close_old_connections()
+                results = tasks.run_pending(worker, options['batch'])
+                done += results.count(True)
+                failed += results.count(False)
+                if not results:
+                    if options['burst']:
+                        break
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Worker {worker} stopped: {done} done, {failed} failed"))
+
+    def stop(self, signum, frame):
+        # Finish the current batch rather than abandoning claimed tasks until their lease expires.
+        self.stopping = True
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from travel import payments
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = "Capture unpaid payments through the payment gateway in batches and mark their reservations paid."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--max-batches', type=int, default=0, help="Stop after this many batches; 0 drains.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        batches = []
+        while not options['max_batches'] or len(batches) < options['max_batches']:
+            result = payments.settle_batch(options['batch_size'])
+            if result is None:
+                break
+            batches.append(result)
+            if options['verbosity'] >= 2:
+                self.stdout.write(
+                    f"batch {len(batches)}: {result.paid} paid, {result.failed} declined "
+                    f"in {result.seconds * 1000:.0f} ms (gateway {result.gateway_seconds * 1000:.0f} ms)"
+                )
+        elapsed = time.perf_counter() - started
+
+        if not batches:
+            self.stdout.write("Nothing to settle")
+            return
+        paid = sum(batch.paid for batch in batches)
+        failed = sum(batch.failed for batch in batches)
+        latencies = [batch.seconds * 1000 for batch in batches]
+        gateway = sum(batch.gateway_seconds for batch in batches)
+        self.stdout.write(
+            f"Settled {paid + failed} payments ({paid} paid, {failed} declined) in {len(batches)} batches, "
+            f"{elapsed:.2f}s: {(paid + failed) / elapsed:.0f} payments/s"
+        )
+        self.stdout.write(
+            f"Batch latency p50 {percentile(latencies, 0.5):.0f} ms, p95 {percentile(latencies, 0.95):.0f} ms, "
+            f"max {max(latencies):.0f} ms; gateway {gateway / elapsed:.0%} of wall time"
+        )
+        self.stdout.write(self.style.SUCCESS("Settlement finished"))
@@ -0,0 +1,96 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from travel.models import Airline, Flight, FlightReservation, Hotel, HotelReservation, Room, Tour, TourReservation, User
+from travel.services import BookingError, book_flight, book_room, book_tour
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire parallel bookings against a single flight, tour or room, report bookings/s and check that nothing "
+        "is oversold. ConcurrentBookingTests covers correctness in the test suite; this measures throughput."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=['flight', 'tour', 'room'], default='flight')
+        parser.add_argument('--inventory', type=int, default=50, help="Seats or slots; for a room, nights on sale.")
+        parser.add_argument('--bookings', type=int, default=300)
+        parser.add_argument('--workers', type=int, default=16)
+
+    def handle(self, *args, **options):
+        kind = options['kind']
+        inventory = options['inventory']
+        user, _ = User.objects.get_or_create(username='stress-booking', defaults={'email': 'stress-booking@example.com'})
+        now = timezone.now()
+
+        if kind == 'flight':
+            airline, _ = Airline.objects.get_or_create(name='Stress Air', defaults={'country': '-'})
+            target = Flight.objects.create(
+                flight_number=f'STRESS-{int(time.time() * 1000)}', origin='AAA', destination='BBB',
+                departure_time=now, arrival_time=now + timedelta(hours=1), airline=airline,
+                seat_count=inventory, available_seats=inventory, price=1,
+            )
+            book, reservations = (lambda i: book_flight(user, target.pk)), FlightReservation.objects.filter(flight=target)
+        elif kind == 'tour':
+            today = now.date()
+            target = Tour.objects.create(
+                name='Stress tour', destination='-', start_date=today, end_date=today,
+                price=1, max_participants=inventory, available_slots=inventory,
+            )
+            book, reservations = (lambda i: book_tour(user, target.pk)), TourReservation.objects.filter(tour=target)
+        else:
+            target = Hotel.objects.create(
+                name='Stress hotel', location_city='-', location_address='-', star_rating=1, manager=user,
+            )
+            room = Room.objects.create(hotel=target, room_number='1', price_per_night=1)
+            first_night = now.date() + timedelta(days=1)
+            stays = [random.Random(i).randrange(inventory) for i in range(options['bookings'])]
+
+            def book(i):
+                check_in = first_night + timedelta(days=stays[i])
+                return book_room(user, room.pk, check_in, check_in + timedelta(days=1 + i % 3))
+
+            reservations = HotelReservation.objects.filter(room=room)
+
+        def attempt(i):
+            try:
+                book(i)
+                return True
+            except BookingError:
+                return False
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            results = list(pool.map(attempt, range(options['bookings'])))
+        elapsed = time.perf_counter() - started
+
+        target.refresh_from_db()
+        booked = reservations.count()
+        if kind == 'room':
+            stays = sorted(reservations.values_list('check_in', 'check_out'))
+            oversold = any(earlier[1] > later[0] for earlier, later in zip(stays, stays[1:]))
+            summary = f"{sum((out - start).days for start, out in stays)} nights booked"
+        else:
+            remaining = target.available_seats if kind == 'flight' else target.available_slots
+            oversold = booked + remaining != inventory or booked > inventory
+            summary = f"{remaining} left"
+        self.stdout.write(
+            f"{options['bookings']} attempts, {sum(results)} succeeded, {booked} reservations, {summary} "
+            f"in {elapsed:.2f}s ({options['bookings'] / elapsed:.0f} bookings/s)"
+        )
+        distinct_seats = reservations.values('seat_number').distinct().count() if kind == 'flight' else booked
+        target.delete()
+
+        if booked != sum(results) or oversold:
+            raise CommandError("Inventory was oversold")
+        if distinct_seats != booked:
+            raise CommandError("A seat was assigned twice")
+        self.stdout.write(self.style.SUCCESS("No overselling detected"))
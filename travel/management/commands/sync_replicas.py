@@ -0,0 +1,42 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from travel import routers
+
+
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database into every replica with SQLite's online backup API."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help="Keep syncing every this many seconds; 0 syncs once and exits.")
+
+    def handle(self, *args, **options):
+        aliases = routers.replicas()
+        if not aliases:
+            raise CommandError("No replicas configured; set DATABASE_REPLICAS.")
+        primary = connections[routers.PRIMARY].settings_dict
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError("sync_replicas copies SQLite files; use the database's own replication elsewhere.")
+        while True:
+            for alias in aliases:
+                started = time.perf_counter()
+                self.copy(primary['NAME'], connections[alias].settings_dict['NAME'])
+                self.stdout.write(f"{alias}: synced in {(time.perf_counter() - started) * 1000:.0f} ms")
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def copy(self, source_path, target_path):
+        # The whole copy is one backup step under the target's write lock, so replica readers see either
+        # the previous copy or the new one, never a torn file.
+        source = sqlite3.connect(f'file:{source_path}?mode=ro', uri=True)
+        target = sqlite3.connect(target_path, timeout=20)
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
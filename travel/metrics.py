@@ -0,0 +1,200 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+from django.conf import settings
+
+from . import cache as listing_cache
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (1_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000)
+HISTOGRAMS = (
+    ('latency', 'http_request_duration_seconds', "Request latency.", LATENCY_BUCKETS),
+    ('queries', 'http_request_db_queries', "Database queries per request.", QUERY_BUCKETS),
+    ('response_bytes', 'http_response_size_bytes', "Response body size.", SIZE_BUCKETS),
+)
+FLUSH_SECONDS = 1.0
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Registry:
+    """Request metrics for one process; every observation is a few dict lookups under one lock.
+
+    With METRICS_DIR set, each process also writes its totals to a file of its own there, at most every
+    FLUSH_SECONDS, and render() adds up every file so /metrics reports all workers whichever one serves it.
+    A worker's file goes away with it, so /metrics covers the workers that are running."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = {}
+        self.latency = {}
+        self.queries = {}
+        self.query_seconds = {}
+        self.response_bytes = {}
+        self.pid = os.getpid()
+        self.filename = f'{self.pid}-{time.time_ns()}.json'
+        self.flushed_at = 0.0
+
+    def observe(self, route, method, status, seconds, queries, query_seconds, size):
+        key = (route, method)
+        with self.lock:
+            if self.pid != os.getpid():
+                # A forked worker starts from zero; the counts it inherited are the parent's.
+                self.reset()
+            self.requests[(route, method, status)] = self.requests.get((route, method, status), 0) + 1
+            if key not in self.latency:
+                self.latency[key] = Histogram(LATENCY_BUCKETS)
+                self.queries[key] = Histogram(QUERY_BUCKETS)
+                self.response_bytes[key] = Histogram(SIZE_BUCKETS)
+                self.query_seconds[key] = 0.0
+            self.latency[key].observe(seconds)
+            self.queries[key].observe(queries)
+            self.query_seconds[key] += query_seconds
+            if size is not None:
+                self.response_bytes[key].observe(size)
+        if time.monotonic() - self.flushed_at >= FLUSH_SECONDS:
+            self.flush()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'requests': [[*key, count] for key, count in self.requests.items()],
+                'histograms': {
+                    attr: [[*key, h.counts, h.sum] for key, h in getattr(self, attr).items()]
+                    for attr, *_ in HISTOGRAMS
+                },
+                'query_seconds': [[*key, seconds] for key, seconds in self.query_seconds.items()],
+                'listing_cache': listing_cache.stats(),
+            }
+
+    def flush(self):
+        self.flushed_at = time.monotonic()
+        directory = getattr(settings, 'METRICS_DIR', None)
+        if not directory:
+            return
+        path = os.path.join(directory, self.filename)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(f'{path}.tmp', 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(f'{path}.tmp', path)
+        except OSError:
+            logger.warning("Could not write request metrics to %s", path, exc_info=True)
+
+    def discard(self):
+        directory = getattr(settings, 'METRICS_DIR', None)
+        if not directory or not self.flushed_at:
+            return
+        try:
+            os.remove(os.path.join(directory, self.filename))
+        except OSError:
+            pass
+
+    def snapshots(self):
+        directory = getattr(settings, 'METRICS_DIR', None)
+        if not directory:
+            return [self.snapshot()]
+        self.flush()
+        snapshots = []
+        for path in glob.glob(os.path.join(directory, '*.json')):
+            pid = os.path.basename(path).split('-')[0]
+            if pid.isdigit() and not process_alive(int(pid)):
+                # Killed before its atexit hook could run.
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                logger.warning("Skipping unreadable metrics file %s", path)
+        return snapshots
+
+    def render(self):
+        merged = merge(self.snapshots())
+        lines = ['# HELP http_requests_total Requests served.', '# TYPE http_requests_total counter']
+        for (route, method, status), count in sorted(merged['requests'].items()):
+            lines.append(f'http_requests_total{{{labels(route=route, method=method, status=status)}}} {count}')
+        for attr, name, help_text, buckets in HISTOGRAMS:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+            for (route, method), (counts, total) in sorted(merged['histograms'][attr].items()):
+                base = labels(route=route, method=method)
+                lines += [f'{name}_bucket{{{base},le="{bound}"}} {n}' for bound, n in cumulative(buckets, counts)]
+                lines += [f'{name}_sum{{{base}}} {total:g}', f'{name}_count{{{base}}} {sum(counts)}']
+        lines += ['# HELP http_request_db_seconds_total Time spent in database queries.',
+                  '# TYPE http_request_db_seconds_total counter']
+        for (route, method), seconds in sorted(merged['query_seconds'].items()):
+            lines.append(f'http_request_db_seconds_total{{{labels(route=route, method=method)}}} {seconds:g}')
+        stats = merged['listing_cache']
+        lines += ['# HELP listing_cache_requests_total Listing cache lookups.',
+                  '# TYPE listing_cache_requests_total counter']
+        lines += [f'listing_cache_requests_total{{result="{result}"}} {stats[result]}' for result in ('hits', 'misses')]
+        return '\n'.join(lines) + '\n'
+
+
+def merge(snapshots):
+    requests, query_seconds, cache_stats = Counter(), Counter(), Counter({'hits': 0, 'misses': 0})
+    histograms = {attr: {} for attr, *_ in HISTOGRAMS}
+    for snapshot in snapshots:
+        for route, method, status, count in snapshot['requests']:
+            requests[(route, method, status)] += count
+        for attr, rows in snapshot['histograms'].items():
+            for route, method, counts, total in rows:
+                merged = histograms[attr].setdefault((route, method), [[0] * len(counts), 0.0])
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+        for route, method, seconds in snapshot['query_seconds']:
+            query_seconds[(route, method)] += seconds
+        cache_stats.update(snapshot['listing_cache'])
+    return {'requests': requests, 'histograms': histograms, 'query_seconds': query_seconds, 'listing_cache': cache_stats}
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def cumulative(buckets, counts):
+    running = 0
+    for bound, count in zip(buckets, counts):
+        running += count
+        yield f'{bound:g}', running
+    yield '+Inf', running + counts[-1]
+
+
+def labels(**values):
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values.values())
+    return ','.join(f'{name}="{value}"' for name, value in zip(values, escaped))
+
+
+registry = Registry()
+atexit.register(registry.discard)
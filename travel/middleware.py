@@ -0,0 +1,114 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from . import routers
+from .authentication import token_user_id
+from .metrics import registry
+
+logger = logging.getLogger('travel.requests')
+
+MAX_CAPTURED_QUERIES = 50
+
+
+class QueryRecorder:
+    """execute_wrapper that counts and times queries, keeping the first few statements for the slow log."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.captured = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.seconds += elapsed
+            if len(self.captured) < MAX_CAPTURED_QUERIES:
+                self.captured.append((sql, elapsed))
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_seconds = getattr(settings, 'METRICS_SLOW_REQUEST_MS', 500) / 1000
+        self.log_requests = getattr(settings, 'METRICS_LOG_REQUESTS', False)
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = request.resolver_match
+        route = match.route if match else '<unmatched>'
+        size = None if response.streaming else len(response.content)
+        registry.observe(route, request.method, response.status_code, elapsed, recorder.count, recorder.seconds, size)
+
+        slow = elapsed >= self.slow_seconds
+        if slow or self.log_requests:
+            record = {
+                'method': request.method, 'path': request.path, 'route': route, 'status': response.status_code,
+                'ms': round(elapsed * 1000, 1), 'queries': recorder.count, 'db_ms': round(recorder.seconds * 1000, 1),
+                'bytes': size,
+            }
+            if slow:
+                record['sql'] = [{'ms': round(seconds * 1000, 2), 'sql': sql} for sql, seconds in recorder.captured]
+                logger.warning(json.dumps(record))
+            else:
+                logger.info(json.dumps(record))
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """Lets safe-method requests read from replicas, except for a client that wrote within REPLICA_STICKY_SECONDS.
+
+    Browsers are recognised by a cookie. API clients rarely keep cookies, so a write with a Bearer token also
+    pins that token's user to the primary through a short-lived cache entry."""
+
+    cookie_name = 'primary_until'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sticky_seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+
+    def __call__(self, request):
+        if not routers.replicas():
+            return self.get_response(request)
+        user_id = token_user_id(request)
+        safe = request.method in ('GET', 'HEAD', 'OPTIONS')
+        allowed = safe and self.primary_until(request, user_id) < time.time()
+        with routers.reading_from_replicas(allowed):
+            response = self.get_response(request)
+        if not safe and response.status_code < 400:
+            primary_until = time.time() + self.sticky_seconds
+            response.set_cookie(
+                self.cookie_name, f'{primary_until:.0f}', max_age=self.sticky_seconds, httponly=True, samesite='Lax',
+            )
+            if user_id is not None:
+                cache.set(sticky_key(user_id), primary_until, self.sticky_seconds)
+        return response
+
+    def primary_until(self, request, user_id):
+        try:
+            primary_until = float(request.COOKIES.get(self.cookie_name, 0))
+        except ValueError:
+            primary_until = 0
+        if user_id is not None:
+            primary_until = max(primary_until, cache.get(sticky_key(user_id), 0))
+        return primary_until
+
+
+def sticky_key(user_id):
+    return f'primary-until:{user_id}'
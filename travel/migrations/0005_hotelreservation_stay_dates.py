@@ -0,0 +1,66 @@
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def backfill_stay_dates(apps, schema_editor):
+    HotelReservation = apps.get_model('travel', 'HotelReservation')
+    for reservation in HotelReservation.objects.filter(check_in__isnull=True).iterator():
+        reservation.check_in = reservation.reservation_date.date()
+        reservation.check_out = reservation.check_in + timedelta(days=1)
+        reservation.save(update_fields=['check_in', 'check_out'])
+
+
+def reopen_booked_rooms(apps, schema_editor):
+    # Booking used to clear is_available for good; availability now comes from the stay dates, so a room
+    # with reservations was closed by a booking, not by staff.
+    Room = apps.get_model('travel', 'Room')
+    HotelReservation = apps.get_model('travel', 'HotelReservation')
+    Room.objects.filter(
+        is_available=False, pk__in=HotelReservation.objects.values('room_id'),
+    ).update(is_available=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel', '0004_remove_payment_reservation_flightreservation_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotelreservation',
+            name='check_in',
+            field=models.DateField(null=True),
+        ),
+        migrations.AddField(
+            model_name='hotelreservation',
+            name='check_out',
+            field=models.DateField(null=True),
+        ),
+        migrations.RunPython(backfill_stay_dates, migrations.RunPython.noop),
+        migrations.RunPython(reopen_booked_rooms, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='hotelreservation',
+            name='check_in',
+            field=models.DateField(),
+        ),
+        migrations.AlterField(
+            model_name='hotelreservation',
+            name='check_out',
+            field=models.DateField(),
+        ),
+        migrations.AlterField(
+            model_name='room',
+            name='is_available',
+            field=models.BooleanField(default=True, help_text='Uncheck to take the room out of sale.'),
+        ),
+        migrations.AddIndex(
+            model_name='hotelreservation',
+            index=models.Index(fields=['room', 'check_in', 'check_out'], name='hotelres_room_stay_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='hotelreservation',
+            constraint=models.CheckConstraint(check=models.Q(('check_out__gt', models.F('check_in'))), name='hotelres_stay_not_empty'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.11 on 2026-10-18 17:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel', '0005_hotelreservation_stay_dates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Airport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(help_text="IATA code, e.g. 'IKA'", max_length=4, unique=True)),
+                ('name', models.CharField(max_length=200)),
+                ('city', models.CharField(db_index=True, max_length=100)),
+                ('country', models.CharField(blank=True, max_length=100)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['origin', 'destination', 'departure_time'], name='flight_route_departure_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['origin', 'destination', 'price'], name='flight_route_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['departure_time'], name='flight_departure_idx'),
+        ),
+    ]
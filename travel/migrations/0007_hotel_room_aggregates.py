@@ -0,0 +1,50 @@
+# Generated by Django 4.2.11 on 2026-10-18 17:27
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_room_aggregates(apps, schema_editor):
+    Hotel = apps.get_model('travel', 'Hotel')
+    Room = apps.get_model('travel', 'Room')
+    rooms = Room.objects.filter(hotel=OuterRef('pk')).order_by().values('hotel')
+    Hotel.objects.update(
+        min_price=Subquery(rooms.annotate(value=Min('price_per_night')).values('value')),
+        max_price=Subquery(rooms.annotate(value=Max('price_per_night')).values('value')),
+        room_count=Coalesce(Subquery(rooms.annotate(value=Count('id')).values('value')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel', '0006_airport_flight_route_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotel',
+            name='max_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='min_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='room_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['location_city', 'min_price', 'id'], name='hotel_city_min_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['min_price', 'id'], name='hotel_min_price_idx'),
+        ),
+        migrations.RunPython(backfill_room_aggregates, migrations.RunPython.noop),
+    ]
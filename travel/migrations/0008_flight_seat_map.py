@@ -0,0 +1,73 @@
+# Generated by Django 4.2.11 on 2026-10-18 17:32
+
+import re
+
+from django.db import migrations, models
+
+from travel.seatmap import SeatMap
+
+
+# Labels written before seat maps existed, e.g. 'A25', put the letter first.
+LETTER_FIRST_RE = re.compile(r'^([A-Z])(\d+)$')
+
+
+def seat_index(seat_map, label):
+    index = seat_map.index(label)
+    if index is None:
+        match = LETTER_FIRST_RE.match(label.strip().upper())
+        if match:
+            index = seat_map.index(f'{match.group(2)}{match.group(1)}')
+    return index
+
+
+def build_seat_maps(apps, schema_editor):
+    """Mark each reservation's seat in its flight's map without touching the reservation itself. A label
+    that names no seat of the layout, or a seat already taken, still holds a seat in available_seats."""
+    Flight = apps.get_model('travel', 'Flight')
+    FlightReservation = apps.get_model('travel', 'FlightReservation')
+    for flight in Flight.objects.iterator():
+        seat_map = SeatMap(flight.seat_layout, flight.seat_count)
+        labels, unplaced = set(), 0
+        for reservation in FlightReservation.objects.filter(flight=flight).order_by('pk'):
+            label = reservation.seat_number
+            if label and label in labels:
+                # flightres_unique_seat, added below, would fail; only a person can decide who keeps the seat.
+                raise RuntimeError(
+                    f"Flight {flight.pk} has more than one reservation for seat {label!r}. "
+                    f"Reassign them before running this migration."
+                )
+            labels.add(label)
+            index = seat_index(seat_map, label) if label else None
+            if index is not None and seat_map.is_free(index):
+                seat_map.take([index])
+            else:
+                unplaced += 1
+        free = sum(seat_map.is_free(index) for index in range(flight.seat_count))
+        Flight.objects.filter(pk=flight.pk).update(
+            seat_map=seat_map.to_bytes(), available_seats=max(free - unplaced, 0),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel', '0007_hotel_room_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flight',
+            name='seat_layout',
+            field=models.CharField(default='ABC-DEF', help_text="Seat letters per row, '-' marks an aisle, e.g. 'ABC-DEFG-HJK'", max_length=20),
+        ),
+        migrations.AddField(
+            model_name='flight',
+            name='seat_map',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.RunPython(build_seat_maps, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='flightreservation',
+            constraint=models.UniqueConstraint(condition=models.Q(('seat_number', ''), _negated=True), fields=('flight', 'seat_number'), name='flightres_unique_seat'),
+        ),
+    ]
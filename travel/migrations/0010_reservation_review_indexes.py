@@ -0,0 +1,73 @@
+# Generated by Django 4.2.11 on 2026-10-18 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel', '0009_rating_summaries'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['price', 'id'], name='flight_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flightreservation',
+            index=models.Index(fields=['user', '-reservation_date'], name='flightres_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flightreservation',
+            index=models.Index(fields=['reservation_date'], name='flightres_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flightreservation',
+            index=models.Index(condition=models.Q(('payment_status', 'Unpaid')), fields=['reservation_date'], name='flightres_unpaid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotelreservation',
+            index=models.Index(fields=['user', '-reservation_date'], name='hotelres_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotelreservation',
+            index=models.Index(fields=['reservation_date'], name='hotelres_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotelreservation',
+            index=models.Index(condition=models.Q(('payment_status', 'Unpaid')), fields=['reservation_date'], name='hotelres_unpaid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['room', 'review_type', '-created_at'], name='review_room_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['flight', 'review_type', '-created_at'], name='review_flight_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['tour', 'review_type', '-created_at'], name='review_tour_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['-created_at'], name='review_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tour',
+            index=models.Index(fields=['price', 'id'], name='tour_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tourreservation',
+            index=models.Index(fields=['user', '-reservation_date'], name='tourres_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tourreservation',
+            index=models.Index(fields=['reservation_date'], name='tourres_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tourreservation',
+            index=models.Index(condition=models.Q(('payment_status', 'Unpaid')), fields=['reservation_date'], name='tourres_unpaid_idx'),
+        ),
+    ]
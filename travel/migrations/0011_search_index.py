@@ -0,0 +1,66 @@
+from django.db import migrations
+
+# A snapshot of travel.search as of this migration: rowid = object id * 3 + the kind's position in
+# ('hotel', 'tour', 'flight'), and the same title, body and place columns as search.build_document().
+CREATE_INDEX = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS travel_search_index "
+    "USING fts5(title, body, place, tokenize='unicode61 remove_diacritics 2')"
+)
+BACKFILL = [
+    """
+    INSERT INTO travel_search_index (rowid, title, body, place)
+    SELECT h.id * 3, h.name,
+           COALESCE(h.description, '') || COALESCE(' ' || (
+               SELECT group_concat(name, ' ') FROM (
+                   SELECT DISTINCT a.name AS name
+                   FROM travel_room r
+                   JOIN travel_room_amenities ra ON ra.room_id = r.id
+                   JOIN travel_amenity a ON a.id = ra.amenity_id
+                   WHERE r.hotel_id = h.id
+                   ORDER BY a.name
+               )
+           ), ''),
+           h.location_city || ' ' || h.location_address
+    FROM travel_hotel h
+    """,
+    """
+    INSERT INTO travel_search_index (rowid, title, body, place)
+    SELECT t.id * 3 + 1, t.name, COALESCE(t.description, ''), t.destination
+    FROM travel_tour t
+    """,
+    """
+    INSERT INTO travel_search_index (rowid, title, body, place)
+    SELECT f.id * 3 + 2, f.flight_number, a.name, f.origin || ' ' || f.destination
+    FROM travel_flight f
+    JOIN travel_airline a ON a.id = f.airline_id
+    """,
+]
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 is SQLite's; other databases search through DatabaseSearchBackend.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(CREATE_INDEX)
+        cursor.execute("DELETE FROM travel_search_index")
+        for sql in BACKFILL:
+            cursor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS travel_search_index")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel', '0010_reservation_review_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
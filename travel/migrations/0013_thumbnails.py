@@ -0,0 +1,23 @@
+# Generated by Django 4.2.11 on 2026-10-18 17:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel', '0012_place_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotel',
+            name='thumbnail_digest',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='tour',
+            name='thumbnail_digest',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
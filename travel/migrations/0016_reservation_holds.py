@@ -0,0 +1,40 @@
+# Generated by Django 4.2.11 on 2026-10-18 18:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel', '0015_payments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flightreservation',
+            name='hold_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='hotelreservation',
+            name='hold_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tourreservation',
+            name='hold_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='flightreservation',
+            index=models.Index(condition=models.Q(('hold_expires_at__isnull', False)), fields=['hold_expires_at'], name='flightres_hold_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotelreservation',
+            index=models.Index(condition=models.Q(('hold_expires_at__isnull', False)), fields=['hold_expires_at'], name='hotelres_hold_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tourreservation',
+            index=models.Index(condition=models.Q(('hold_expires_at__isnull', False)), fields=['hold_expires_at'], name='tourres_hold_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-18 18:24
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel', '0016_reservation_holds'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(django.db.models.functions.text.Lower('location_city'), name='hotel_city_lower_idx'),
+        ),
+    ]
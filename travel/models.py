@@ -1,5 +1,10 @@
 from django.db import models
+from django.db.models import Exists, OuterRef, Subquery
+from django.db.models.functions import Cast, Coalesce, Lower, NullIf
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
+
+from . import thumbnails
 
 
 class User(AbstractUser):
@@ -21,7 +26,106 @@ class Airline(models.Model):
         return self.name
 
 
-class Flight(models.Model):
+class AirportQuerySet(models.QuerySet):
+    def matching(self, term):
+        term = term.strip()
+        return self.filter(models.Q(code__iexact=term) | models.Q(city__iexact=term))
+
+    def places_for(self, term):
+        places = set()
+        for code, city in self.matching(term).values_list('code', 'city'):
+            places.update((code, city))
+        return places
+
+    def canonical(self, term):
+        term = term.strip()
+        airport = self.matching(term).first()
+        if airport is None:
+            return term
+        return airport.code if airport.code.lower() == term.lower() else airport.city
+
+
+class Airport(models.Model):
+    code = models.CharField(max_length=4, unique=True, help_text="IATA code, e.g. 'IKA'")
+    name = models.CharField(max_length=200)
+    city = models.CharField(max_length=100, db_index=True)
+    country = models.CharField(max_length=100, blank=True)
+
+    objects = AirportQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        self.code = self.code.strip().upper()
+        self.city = self.city.strip()
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.code} ({self.city})"
+
+
+class RatedQuerySet(models.QuerySet):
+    def apply_review(self, rating, delta=1):
+        count = models.F('review_count') + delta
+        total = models.F('rating_total') + delta * rating
+        return self.update(
+            review_count=count,
+            rating_total=total,
+            average_rating=Coalesce(Cast(total, models.FloatField()) / NullIf(count, 0), 0.0),
+            **{f'rating_{rating}_count': models.F(f'rating_{rating}_count') + delta},
+        )
+
+    def rebuild_ratings(self, review_lookup):
+        reviews = Review.objects.filter(**{review_lookup: OuterRef('pk')}).order_by().values(review_lookup)
+
+        def aggregate(expression, **filters):
+            value = reviews.filter(**filters).annotate(value=expression).values('value')
+            return Coalesce(Subquery(value), 0)
+
+        count = aggregate(models.Count('id'))
+        total = aggregate(models.Sum('rating'))
+        return self.update(
+            review_count=count,
+            rating_total=total,
+            average_rating=Coalesce(Cast(total, models.FloatField()) / NullIf(count, 0), 0.0),
+            **{f'rating_{i}_count': aggregate(models.Count('id'), rating=i) for i in range(1, 6)},
+        )
+
+
+class RatedModel(models.Model):
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_total = models.PositiveIntegerField(default=0, editable=False)
+    average_rating = models.FloatField(default=0, editable=False)
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False)
+
+    RATING_FIELDS = (
+        'review_count', 'rating_total', 'average_rating',
+        'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count',
+    )
+
+    class Meta:
+        abstract = True
+
+    @property
+    def rating_histogram(self):
+        return {i: getattr(self, f'rating_{i}_count') for i in range(1, 6)}
+
+    def save(self, *args, **kwargs):
+        # Review signals own the rating columns; don't overwrite them with stale in-memory values.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.denormalized_fields()
+            ]
+        super().save(*args, **kwargs)
+
+    def denormalized_fields(self):
+        return self.RATING_FIELDS
+
+
+class Flight(RatedModel):
     flight_number = models.CharField(max_length=255, unique=True)
     origin = models.CharField(max_length=255)
     destination = models.CharField(max_length=255)
@@ -31,6 +135,27 @@ class Flight(models.Model):
     seat_count = models.IntegerField()
     available_seats = models.IntegerField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    seat_layout = models.CharField(
+        max_length=20, default='ABC-DEF', help_text="Seat letters per row, '-' marks an aisle, e.g. 'ABC-DEFG-HJK'"
+    )
+    seat_map = models.BinaryField(default=b'', editable=False)
+
+    objects = RatedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['average_rating', 'id'], name='flight_rating_idx'),
+            models.Index(fields=['origin', 'destination', 'departure_time'], name='flight_route_departure_idx'),
+            models.Index(fields=['origin', 'destination', 'price'], name='flight_route_price_idx'),
+            models.Index(fields=['departure_time'], name='flight_departure_idx'),
+            models.Index(fields=['price', 'id'], name='flight_price_idx'),
+            models.Index(fields=['destination'], name='flight_destination_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.origin = Airport.objects.canonical(self.origin)
+        self.destination = Airport.objects.canonical(self.destination)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.flight_number} ({self.origin} → {self.destination})"
@@ -47,7 +172,17 @@ class Amenity(models.Model):
         verbose_name_plural = "Amenities"
 
 
-class Hotel(models.Model):
+class HotelQuerySet(RatedQuerySet):
+    def refresh_room_aggregates(self):
+        rooms = Room.objects.filter(hotel=OuterRef('pk')).order_by().values('hotel')
+        return self.update(
+            min_price=Subquery(rooms.annotate(value=models.Min('price_per_night')).values('value')),
+            max_price=Subquery(rooms.annotate(value=models.Max('price_per_night')).values('value')),
+            room_count=Coalesce(Subquery(rooms.annotate(value=models.Count('id')).values('value')), 0),
+        )
+
+
+class Hotel(RatedModel):
     name = models.CharField(max_length=200)
     location_city = models.CharField(max_length=100)
     location_address = models.TextField()
@@ -58,6 +193,30 @@ class Hotel(models.Model):
     contact_email = models.EmailField(blank=True)
     main_image = models.ImageField(upload_to='hotel_images/', blank=True, null=True)
     manager = models.ForeignKey(User, on_delete=models.CASCADE, related_name='managed_hotels')
+    min_price = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True, editable=False)
+    max_price = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True, editable=False)
+    room_count = models.PositiveIntegerField(default=0, editable=False)
+    thumbnail_digest = models.CharField(max_length=64, blank=True, editable=False)
+
+    objects = HotelQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['location_city', 'min_price', 'id'], name='hotel_city_min_price_idx'),
+            models.Index(Lower('location_city'), name='hotel_city_lower_idx'),
+            models.Index(fields=['min_price', 'id'], name='hotel_min_price_idx'),
+            models.Index(fields=['average_rating', 'id'], name='hotel_rating_idx'),
+        ]
+
+    ROOM_AGGREGATE_FIELDS = ('min_price', 'max_price', 'room_count')
+
+    def denormalized_fields(self):
+        # Room signals own these columns as well.
+        return self.RATING_FIELDS + self.ROOM_AGGREGATE_FIELDS
+
+    @property
+    def thumbnails(self):
+        return thumbnails.urls(self.thumbnail_digest)
 
     def __str__(self):
         return f"{self.name} ({self.location_city})"
@@ -71,14 +230,28 @@ class RoomType(models.Model):
         return self.name
 
 
-class Room(models.Model):
+class RoomQuerySet(RatedQuerySet):
+    def available(self, check_in, check_out, guests=1, city=None):
+        overlapping = HotelReservation.objects.filter(
+            room=OuterRef('pk'), check_in__lt=check_out, check_out__gt=check_in
+        ).exclude(hold_expires_at__lte=timezone.now())
+        rooms = self.filter(is_available=True, capacity__gte=guests).exclude(Exists(overlapping))
+        if city:
+            # iexact compiles to LIKE on SQLite, which can't use an index; lower() = lower() can.
+            rooms = rooms.alias(city_key=Lower('hotel__location_city')).filter(city_key=Lower(models.Value(city)))
+        return rooms
+
+
+class Room(RatedModel):
     hotel = models.ForeignKey(Hotel, related_name='rooms', on_delete=models.CASCADE)
     room_type = models.ForeignKey(RoomType, on_delete=models.SET_NULL, null=True)
     room_number = models.CharField(max_length=10, help_text="e.g., '101', 'A-203'")
     capacity = models.PositiveSmallIntegerField(default=1)
     price_per_night = models.DecimalField(max_digits=8, decimal_places=2)
     amenities = models.ManyToManyField(Amenity, blank=True, related_name='rooms')
-    is_available = models.BooleanField(default=True)
+    is_available = models.BooleanField(default=True, help_text="Uncheck to take the room out of sale.")
+
+    objects = RoomQuerySet.as_manager()
 
     def __str__(self):
         return f"Room {self.room_number} ({self.room_type.name if self.room_type else 'N/A'}) - {self.hotel.name}"
@@ -95,6 +268,8 @@ class BaseReservation(models.Model):
         choices=[('Paid', 'Paid'), ('Unpaid', 'Unpaid')],
         default='Paid'
     )
+    # Set while the reservation is only a hold; release_holds deletes it after this time unless it is confirmed.
+    hold_expires_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         abstract = True
@@ -104,6 +279,20 @@ class BaseReservation(models.Model):
 
 class HotelReservation(BaseReservation):
     room = models.ForeignKey(Room, on_delete=models.CASCADE)
+    check_in = models.DateField()
+    check_out = models.DateField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['room', 'check_in', 'check_out'], name='hotelres_room_stay_idx'),
+            models.Index(fields=['user', '-reservation_date'], name='hotelres_user_date_idx'),
+            models.Index(fields=['reservation_date'], name='hotelres_date_idx'),
+            models.Index(fields=['reservation_date'], name='hotelres_unpaid_idx', condition=models.Q(payment_status='Unpaid')),
+            models.Index(fields=['hold_expires_at'], name='hotelres_hold_idx', condition=models.Q(hold_expires_at__isnull=False)),
+        ]
+        constraints = [
+            models.CheckConstraint(check=models.Q(check_out__gt=models.F('check_in')), name='hotelres_stay_not_empty'),
+        ]
 
     def __str__(self):
         return f"Hotel Reservation #{self.pk} - Room: {self.room} - User: {self.user.username}"
@@ -112,12 +301,33 @@ class FlightReservation(BaseReservation):
     flight = models.ForeignKey(Flight, on_delete=models.CASCADE)
     seat_number = models.CharField(max_length=10)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-reservation_date'], name='flightres_user_date_idx'),
+            models.Index(fields=['reservation_date'], name='flightres_date_idx'),
+            models.Index(fields=['reservation_date'], name='flightres_unpaid_idx', condition=models.Q(payment_status='Unpaid')),
+            models.Index(fields=['hold_expires_at'], name='flightres_hold_idx', condition=models.Q(hold_expires_at__isnull=False)),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['flight', 'seat_number'], condition=~models.Q(seat_number=''), name='flightres_unique_seat'
+            ),
+        ]
+
     def __str__(self):
         return f"Flight Reservation #{self.pk} - Flight: {self.flight} - User: {self.user.username}"
 
 class TourReservation(BaseReservation):
     tour = models.ForeignKey('Tour', on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-reservation_date'], name='tourres_user_date_idx'),
+            models.Index(fields=['reservation_date'], name='tourres_date_idx'),
+            models.Index(fields=['reservation_date'], name='tourres_unpaid_idx', condition=models.Q(payment_status='Unpaid')),
+            models.Index(fields=['hold_expires_at'], name='tourres_hold_idx', condition=models.Q(hold_expires_at__isnull=False)),
+        ]
+
     def __str__(self):
         return f"Tour Reservation #{self.pk} - Tour: {self.tour} - User: {self.user.username}"
 
@@ -139,12 +349,39 @@ class Payment(models.Model):
 
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHODS, default='Credit Card')
-    status = models.CharField(max_length=6, choices=[('Paid', 'Paid'), ('Unpaid', 'Unpaid')], default='Paid')
+    status = models.CharField(
+        max_length=6, choices=[('Paid', 'Paid'), ('Unpaid', 'Unpaid'), ('Failed', 'Failed')], default='Paid'
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+    settled_at = models.DateTimeField(null=True, blank=True)
+    gateway_reference = models.CharField(max_length=100, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['id'], name='payment_unpaid_idx', condition=models.Q(status='Unpaid')),
+        ]
 
     def __str__(self):
         return f"Payment for Reservation #{self.pk}"
+
+
+# A client-supplied Idempotency-Key for a booking POST; a retry with the same key gets the original reservations.
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    kind = models.CharField(max_length=6)
+    reservation_ids = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_user_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.kind})"
     
-class Tour(models.Model):
+class Tour(RatedModel):
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     destination = models.CharField(max_length=255)
@@ -155,6 +392,20 @@ class Tour(models.Model):
     available_slots = models.PositiveIntegerField()
     guide_name = models.CharField(max_length=100, blank=True, null=True)
     image = models.ImageField(upload_to='tour_images/', blank=True, null=True)
+    thumbnail_digest = models.CharField(max_length=64, blank=True, editable=False)
+
+    objects = RatedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['average_rating', 'id'], name='tour_rating_idx'),
+            models.Index(fields=['price', 'id'], name='tour_price_idx'),
+            models.Index(fields=['destination'], name='tour_destination_idx'),
+        ]
+
+    @property
+    def thumbnails(self):
+        return thumbnails.urls(self.thumbnail_digest)
 
     def __str__(self):
         return f"{self.name} ({self.destination})"
@@ -172,5 +423,55 @@ class Review(models.Model):
     comment = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['room', 'review_type', '-created_at'], name='review_room_type_idx'),
+            models.Index(fields=['flight', 'review_type', '-created_at'], name='review_flight_type_idx'),
+            models.Index(fields=['tour', 'review_type', '-created_at'], name='review_tour_type_idx'),
+            models.Index(fields=['-created_at'], name='review_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} review ({self.review_type})"
+
+
+class TaskQuerySet(models.QuerySet):
+    def runnable(self, now):
+        # A running task whose lease ran out belongs to a worker that died mid-task; it is retried while it
+        # has attempts left.
+        return self.filter(
+            models.Q(status=Task.QUEUED, run_at__lte=now)
+            | models.Q(status=Task.RUNNING, locked_until__lt=now, attempts__lt=models.F('max_attempts'))
+        )
+
+    def abandoned(self, now):
+        return self.filter(status=Task.RUNNING, locked_until__lt=now, attempts__gte=models.F('max_attempts'))
+
+
+class Task(models.Model):
+    QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=100)
+    args = models.JSONField(default=list, blank=True)
+    idempotency_key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    status = models.CharField(max_length=7, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at', 'id'], name='task_status_run_at_idx'),
+            models.Index(fields=['finished_at'], name='task_finished_idx', condition=models.Q(status='done')),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
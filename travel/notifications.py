@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.mail import send_mail
+from django.template.loader import render_to_string
+
+from . import tasks
+
+
+def reservation_models():
+    from .models import FlightReservation, HotelReservation, TourReservation
+    return {
+        'hotel': HotelReservation.objects.select_related('user', 'room__hotel'),
+        'flight': FlightReservation.objects.select_related('user', 'flight'),
+        'tour': TourReservation.objects.select_related('user', 'tour'),
+    }
+
+
+@tasks.task('notifications.booking_confirmation')
+def send_booking_confirmation(kind, reservation_id):
+    reservation = reservation_models()[kind].filter(pk=reservation_id).first()
+    # Cancelled before the worker got to it.
+    if reservation is None or not reservation.user.email:
+        return
+    body = render_to_string('emails/booking_confirmation.txt', {'kind': kind, 'reservation': reservation})
+    send_mail(
+        f"Your booking #{reservation.pk} is confirmed", body,
+        getattr(settings, 'DEFAULT_FROM_EMAIL', None), [reservation.user.email],
+    )
+
+
+def confirm_booking(kind, reservations):
+    for reservation in reservations:
+        tasks.enqueue_on_commit(
+            'notifications.booking_confirmation', kind, reservation.pk,
+            key=f'booking-confirmation:{kind}:{reservation.pk}',
+        )
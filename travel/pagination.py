@@ -0,0 +1,253 @@
+import base64
+import binascii
+import datetime
+import json
+from operator import attrgetter
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+APPROXIMATE_COUNT_CAP = 1000
+EXACT_COUNT_LIMIT = 10000
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder rounds datetimes to milliseconds, which would skip rows on a datetime key.
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values, direction):
+    payload = json.dumps({'v': values, 'd': direction}, cls=CursorEncoder)
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return payload['v'], payload['d']
+    except (binascii.Error, ValueError, KeyError, TypeError, AttributeError):
+        return None, 'n'
+
+
+def cursor_field(queryset, name):
+    if name in queryset.query.annotations:
+        return queryset.query.annotations[name].output_field
+    opts = queryset.model._meta
+    for part in name.split('__'):
+        field = opts.get_field(part)
+        if field.is_relation:
+            opts = field.related_model._meta
+    return field
+
+
+def coerce_cursor(queryset, ordering, values):
+    """The cursor values converted to their sort fields' types, or None if one doesn't fit (a tampered cursor)."""
+    if isinstance(queryset, MergedQuerySet):
+        queryset = queryset.querysets[0]
+    if not isinstance(values, list) or len(values) != len(ordering):
+        return None
+    if any(value is None or isinstance(value, (list, dict)) for value in values):
+        return None
+    try:
+        return [cursor_field(queryset, field.lstrip('-')).to_python(value) for field, value in zip(ordering, values)]
+    except (FieldDoesNotExist, ValidationError, TypeError, ValueError):
+        return None
+
+
+def keyset_filter(ordering, values, backwards=False):
+    condition = Q()
+    for i, field in enumerate(ordering):
+        descending = field.startswith('-') != backwards
+        clause = Q(**{f"{field.lstrip('-')}__{'lt' if descending else 'gt'}": values[i]})
+        for previous, value in zip(ordering[:i], values):
+            clause &= Q(**{previous.lstrip('-'): value})
+        condition |= clause
+    return condition
+
+
+def reverse_ordering(ordering):
+    return [field[1:] if field.startswith('-') else f'-{field}' for field in ordering]
+
+
+def approximate_count(queryset, cap=APPROXIMATE_COUNT_CAP):
+    return queryset.order_by()[:cap + 1].count()
+
+
+class CappedCountPaginator(Paginator):
+    """Admin paginator that counts at most EXACT_COUNT_LIMIT rows, or up to the requested page if that lies
+    further. A bigger result reports one row past the cap, so the changelist always links the next page and
+    every row stays reachable one page at a time."""
+
+    def __init__(self, object_list, per_page, orphans=0, allow_empty_first_page=True, page_number=1):
+        super().__init__(object_list, per_page, orphans, allow_empty_first_page)
+        try:
+            self.page_number = max(int(page_number), 1)
+        except (TypeError, ValueError):
+            self.page_number = 1
+
+    @cached_property
+    def count(self):
+        return approximate_count(self.object_list, max(EXACT_COUNT_LIMIT, self.page_number * self.per_page))
+
+
+def key_getter(name):
+    getter = attrgetter(name.replace('__', '.'))
+    return lambda row: row[name] if isinstance(row, dict) else getter(row)
+
+
+class MergedQuerySet:
+    """UNION ALL of several querysets that pushes filters, ordering and limits into every branch."""
+
+    def __init__(self, *querysets, ordering=()):
+        self.querysets = querysets
+        self.ordering = list(ordering)
+
+    def filter(self, *args, **kwargs):
+        return MergedQuerySet(*(queryset.filter(*args, **kwargs) for queryset in self.querysets), ordering=self.ordering)
+
+    def order_by(self, *fields):
+        return MergedQuerySet(*self.querysets, ordering=fields)
+
+    def count(self):
+        return sum(queryset.count() for queryset in self.querysets)
+
+    def __getitem__(self, k):
+        if not isinstance(k, slice) or k.stop is None:
+            raise TypeError("MergedQuerySet only supports bounded slices.")
+        branches = [queryset.order_by() for queryset in self.querysets]
+        # SQLite merges index-ordered branches on its own and rejects per-branch LIMITs.
+        if connections[branches[0].db].features.supports_slicing_ordering_in_compound:
+            branches = [branch.order_by(*self.ordering)[:k.stop] for branch in branches]
+        return branches[0].union(*branches[1:], all=True).order_by(*self.ordering)[k]
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None, count=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.count = count
+        self.count_capped = count is not None and count > APPROXIMATE_COUNT_CAP
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def keyset_paginate(queryset, ordering, cursor, page_size, with_count=False):
+    values, direction = decode_cursor(cursor) if cursor else (None, 'n')
+    if values is not None:
+        values = coerce_cursor(queryset, ordering, values)
+    if values is None:
+        direction = 'n'
+    backwards = values is not None and direction == 'p'
+
+    count = approximate_count(queryset) if with_count else None
+    page = queryset.order_by(*(reverse_ordering(ordering) if backwards else ordering))
+    if values is not None:
+        page = page.filter(keyset_filter(ordering, values, backwards))
+    rows = list(page[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+    if not rows:
+        return KeysetPage(rows, count=count)
+
+    getters = [key_getter(field.lstrip('-')) for field in ordering]
+    first = [getter(rows[0]) for getter in getters]
+    last = [getter(rows[-1]) for getter in getters]
+    next_cursor = encode_cursor(last, 'n') if (has_more or backwards) else None
+    previous_cursor = encode_cursor(first, 'p') if (values is not None and (has_more or not backwards)) else None
+    return KeysetPage(rows, next_cursor, previous_cursor, count)
+
+
+class KeysetPagination(BasePagination):
+    page_size = 10
+    page_size_query_param = 'count'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(page_size, self.max_page_size) if page_size > 0 else self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page = keyset_paginate(
+            queryset,
+            view.get_keyset_ordering(),
+            request.query_params.get(self.cursor_query_param),
+            self.get_page_size(request),
+            with_count=request.query_params.get('with_count') in ('1', 'true'),
+        )
+        return list(self.page)
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        body = {
+            'next': self.get_link(self.page.next_cursor),
+            'previous': self.get_link(self.page.previous_cursor),
+        }
+        if self.page.count is not None:
+            body['approximate_count'] = min(self.page.count, APPROXIMATE_COUNT_CAP)
+            body['count_capped'] = self.page.count_capped
+        body['results'] = data
+        return Response(body)
+
+
+class KeysetModeMixin:
+    keyset_orderings = {'default': ['id']}
+
+    def get_keyset_ordering(self):
+        sort = self.request.query_params.get('sort', 'default')
+        return self.keyset_orderings.get(sort, self.keyset_orderings['default'])
+
+    def filter_queryset(self, queryset):
+        # Page-number mode sorts the same way, so ?sort= works without ?pagination=cursor.
+        return super().filter_queryset(queryset).order_by(*self.get_keyset_ordering())
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if params.get('pagination') == 'cursor' or 'cursor' in params:
+                self._paginator = KeysetPagination()
+            else:
+                return super().paginator
+        return self._paginator
+
+
+def keyset_querystring(request):
+    query = request.GET.copy()
+    for param in ('cursor', 'page', 'csrfmiddlewaretoken'):
+        query.pop(param, None)
+    return query.urlencode()
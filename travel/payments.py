@@ -0,0 +1,73 @@
+import random
+import time
+import uuid
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Payment
+from .services import CANCELLERS, PAYMENT_FIELDS, RESERVATION_MODELS
+
+Capture = namedtuple('Capture', 'approved reference')
+BatchResult = namedtuple('BatchResult', 'paid failed seconds gateway_seconds')
+
+
+class StubGateway:
+    """Local stand-in for a card processor: one round trip per batch and a fixed share of declines."""
+
+    round_trip = 0.05
+    decline_rate = 0.02
+
+    def capture(self, charges):
+        """Capture {idempotency_reference: amount}; a real gateway dedupes on the reference, so a retried batch
+        never charges twice. Returns {idempotency_reference: Capture}."""
+        time.sleep(self.round_trip)
+        return {
+            reference: Capture(random.random() >= self.decline_rate, f'stub_{uuid.uuid4().hex[:20]}')
+            for reference in charges
+        }
+
+
+@lru_cache(maxsize=None)
+def get_gateway():
+    return import_string(getattr(settings, 'PAYMENT_GATEWAY', 'travel.payments.StubGateway'))()
+
+
+def settle_batch(batch_size, gateway=None):
+    gateway = gateway or get_gateway()
+    started = time.perf_counter()
+    payments = list(
+        Payment.objects.filter(status='Unpaid').order_by('pk').only(
+            'pk', 'amount', *(f'{field}_id' for field in PAYMENT_FIELDS.values())
+        )[:batch_size]
+    )
+    if not payments:
+        return None
+    gateway_started = time.perf_counter()
+    captures = gateway.capture({f'payment-{payment.pk}': payment.amount for payment in payments})
+    gateway_seconds = time.perf_counter() - gateway_started
+
+    now = timezone.now()
+    paid, failed = [], []
+    for payment in payments:
+        capture = captures[f'payment-{payment.pk}']
+        payment.settled_at = now
+        payment.gateway_reference = capture.reference
+        payment.status = 'Paid' if capture.approved else 'Failed'
+        (paid if capture.approved else failed).append(payment)
+    with transaction.atomic():
+        Payment.objects.bulk_update(payments, ['status', 'settled_at', 'gateway_reference'])
+        for kind, field in PAYMENT_FIELDS.items():
+            reservation_ids = [getattr(p, f'{field}_id') for p in paid if getattr(p, f'{field}_id')]
+            if reservation_ids:
+                RESERVATION_MODELS[kind].objects.filter(pk__in=reservation_ids).update(payment_status='Paid')
+    # A declined reservation gives its room, seat or slot back; the cancel takes its Payment with it.
+    for kind, field in PAYMENT_FIELDS.items():
+        reservation_ids = [getattr(p, f'{field}_id') for p in failed if getattr(p, f'{field}_id')]
+        for reservation in RESERVATION_MODELS[kind].objects.filter(pk__in=reservation_ids):
+            CANCELLERS[kind](reservation)
+    return BatchResult(len(paid), len(failed), time.perf_counter() - started, gateway_seconds)
@@ -11,5 +11,10 @@ class IsAdmin(permissions.BasePermission):
         return request.user and request.user.is_staff
 
 class IsOwnerOrAdmin(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated)
+
     def has_object_permission(self, request, view, obj):
-        return request.user.is_staff or obj.user == request.user
\ No newline at end of file
+        # Users own themselves; everything else is owned through user_id, so no User row is fetched.
+        owner_id = getattr(obj, 'user_id', obj.pk)
+        return request.user.is_staff or owner_id == request.user.id
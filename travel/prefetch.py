@@ -0,0 +1,60 @@
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+
+def _model_field(model, name):
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+
+def related_lookups(serializer, prefix=''):
+    select, prefetch = [], []
+    model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+    if model is None:
+        return select, prefetch
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*' or '.' in field.source:
+            continue
+        model_field = _model_field(model, field.source)
+        if model_field is None or not model_field.is_relation:
+            continue
+        path = f'{prefix}{field.source}'
+
+        if isinstance(field, serializers.ListSerializer) or isinstance(field, serializers.ManyRelatedField):
+            prefetch.append(path)
+            if isinstance(field, serializers.ListSerializer):
+                child_select, child_prefetch = related_lookups(field.child, f'{path}__')
+                prefetch.extend(child_select + child_prefetch)
+        elif model_field.many_to_one or model_field.one_to_one:
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                continue
+            select.append(path)
+            if isinstance(field, serializers.BaseSerializer):
+                child_select, child_prefetch = related_lookups(field, f'{path}__')
+                select.extend(child_select)
+                prefetch.extend(child_prefetch)
+    return select, prefetch
+
+
+@lru_cache(maxsize=None)
+def lookups_for(serializer_class):
+    return related_lookups(serializer_class())
+
+
+def optimize_for_serializer(queryset, serializer_class):
+    select, prefetch = lookups_for(serializer_class)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+class SerializerPrefetchMixin:
+    def filter_queryset(self, queryset):
+        return optimize_for_serializer(super().filter_queryset(queryset), self.get_serializer_class())
@@ -0,0 +1,54 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PRIMARY = 'default'
+# Written and read back within moments of each other by every request.
+PRIMARY_ONLY = {('sessions', 'session'), ('travel', 'task')}
+
+replica_reads = ContextVar('replica_reads', default=False)
+
+
+def replicas():
+    return [alias for alias in settings.DATABASES if alias != PRIMARY]
+
+
+def may_lag(written_at_ns):
+    """Whether this request reads replicas that may not yet include a write made at written_at_ns."""
+    if not replica_reads.get() or not replicas():
+        return False
+    return time.time_ns() - written_at_ns < getattr(settings, 'REPLICA_STICKY_SECONDS', 10) * 1_000_000_000
+
+
+@contextmanager
+def reading_from_replicas(allowed=True):
+    token = replica_reads.set(allowed)
+    try:
+        yield
+    finally:
+        replica_reads.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """Writes go to the primary; reads go to a replica only inside reading_from_replicas(), i.e. during
+    safe-method requests from clients that haven't just written. Anything else (writes' own reads, workers,
+    management commands) reads the primary, so it never acts on replica lag."""
+
+    def db_for_read(self, model, **hints):
+        if not replica_reads.get() or (model._meta.app_label, model._meta.model_name) in PRIMARY_ONLY:
+            return PRIMARY
+        aliases = replicas()
+        return random.choice(aliases) if aliases else PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are byte copies of the primary, schema included.
+        return db == PRIMARY
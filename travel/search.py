@@ -0,0 +1,223 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from . import tasks
+
+SEARCH_KINDS = ('hotel', 'tour', 'flight')
+SEARCH_TABLE = 'travel_search_index'
+SYNC_BATCH_SIZE = 500
+WORD_RE = re.compile(r'\w+')
+
+SearchHit = namedtuple('SearchHit', 'kind object score')
+Document = namedtuple('Document', 'kind object_id title body place')
+
+
+def search_models():
+    from .models import Flight, Hotel, Tour
+    return {'hotel': Hotel, 'tour': Tour, 'flight': Flight}
+
+
+def document_queryset(kind, queryset=None):
+    if queryset is None:
+        queryset = search_models()[kind]._default_manager.all()
+    if kind == 'hotel':
+        return queryset.prefetch_related('rooms__amenities')
+    if kind == 'flight':
+        return queryset.select_related('airline')
+    return queryset
+
+
+def build_document(kind, obj):
+    if kind == 'hotel':
+        amenities = sorted({amenity.name for room in obj.rooms.all() for amenity in room.amenities.all()})
+        return Document(
+            kind, obj.pk, obj.name, ' '.join([obj.description or '', *amenities]),
+            f'{obj.location_city} {obj.location_address}',
+        )
+    if kind == 'tour':
+        return Document(kind, obj.pk, obj.name, obj.description or '', obj.destination)
+    return Document(kind, obj.pk, obj.flight_number, obj.airline.name, f'{obj.origin} {obj.destination}')
+
+
+def documents(kind, queryset=None):
+    for obj in document_queryset(kind, queryset).iterator(chunk_size=SYNC_BATCH_SIZE):
+        yield build_document(kind, obj)
+
+
+def words(query):
+    return WORD_RE.findall(query.lower())
+
+
+class BaseSearchBackend:
+    def install(self):
+        pass
+
+    def uninstall(self):
+        pass
+
+    def index(self, docs):
+        raise NotImplementedError
+
+    def remove(self, kind, object_ids):
+        raise NotImplementedError
+
+    def clear(self, kind):
+        raise NotImplementedError
+
+    def search(self, query, kinds=SEARCH_KINDS, limit=20, offset=0):
+        """Return ranked (kind, object_id, score) tuples, best first."""
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """FTS5 index keyed by rowid, so updates and deletes never scan the index."""
+
+    weights = (10.0, 1.0, 5.0)
+
+    def rowid(self, kind, object_id):
+        return object_id * len(SEARCH_KINDS) + SEARCH_KINDS.index(kind)
+
+    def install(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+                f"USING fts5(title, body, place, tokenize='unicode61 remove_diacritics 2')"
+            )
+
+    def uninstall(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+    def index(self, docs):
+        rows = [(self.rowid(doc.kind, doc.object_id), doc.title, doc.body, doc.place) for doc in docs]
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [(row[0],) for row in rows])
+            cursor.executemany(f"INSERT INTO {SEARCH_TABLE} (rowid, title, body, place) VALUES (%s, %s, %s, %s)", rows)
+
+    def remove(self, kind, object_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s",
+                [(self.rowid(kind, object_id),) for object_id in object_ids],
+            )
+
+    def clear(self, kind):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {SEARCH_TABLE} WHERE rowid %% %s = %s", [len(SEARCH_KINDS), SEARCH_KINDS.index(kind)]
+            )
+
+    def search(self, query, kinds=SEARCH_KINDS, limit=20, offset=0):
+        terms = words(query)
+        if not terms:
+            return []
+        # Every word must match; the last one may still be being typed.
+        match = ' '.join(f'"{term}"' for term in terms[:-1]) + f' "{terms[-1]}"*'
+        match = match.strip()
+        # Ordering by FTS5's rank column ranks every match inside the index and stops at LIMIT.
+        sql = (
+            f"SELECT rowid, rank FROM {SEARCH_TABLE} "
+            f"WHERE {SEARCH_TABLE} MATCH %s AND rank MATCH %s"
+        )
+        params = [match, 'bm25({}, {}, {})'.format(*self.weights)]
+        if set(kinds) != set(SEARCH_KINDS):
+            codes = [SEARCH_KINDS.index(kind) for kind in kinds]
+            sql += f" AND rowid %% {len(SEARCH_KINDS)} IN ({', '.join(map(str, codes))})"
+        sql += " ORDER BY rank LIMIT %s OFFSET %s"
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [*params, limit, offset])
+            return [
+                (SEARCH_KINDS[rowid % len(SEARCH_KINDS)], rowid // len(SEARCH_KINDS), score)
+                for rowid, score in cursor.fetchall()
+            ]
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """Unindexed icontains fallback for databases without a full-text engine wired up."""
+
+    fields = {
+        'hotel': ('name', 'description', 'location_city', 'location_address', 'rooms__amenities__name'),
+        'tour': ('name', 'description', 'destination'),
+        'flight': ('flight_number', 'origin', 'destination', 'airline__name'),
+    }
+
+    def index(self, docs):
+        pass
+
+    def remove(self, kind, object_ids):
+        pass
+
+    def clear(self, kind):
+        pass
+
+    def search(self, query, kinds=SEARCH_KINDS, limit=20, offset=0):
+        terms = words(query)
+        if not terms:
+            return []
+        hits = []
+        for kind in kinds:
+            condition = Q()
+            for term in terms:
+                condition &= Q(*(Q(**{f'{field}__icontains': term}) for field in self.fields[kind]), _connector=Q.OR)
+            ids = search_models()[kind].objects.filter(condition).distinct().order_by('pk')
+            hits.extend((kind, pk, 0.0) for pk in ids.values_list('pk', flat=True)[:offset + limit])
+        return hits[offset:offset + limit]
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    return import_string(getattr(settings, 'SEARCH_BACKEND', 'travel.search.SQLiteFTSBackend'))()
+
+
+@tasks.task('search.sync')
+def sync(kind, object_ids):
+    object_ids = set(object_ids)
+    if not object_ids:
+        return
+    model = search_models()[kind]
+    with transaction.atomic():
+        docs = list(documents(kind, model.objects.filter(pk__in=object_ids)))
+        get_backend().index(docs)
+        get_backend().remove(kind, object_ids - {doc.object_id for doc in docs})
+
+
+def sync_on_commit(kind, object_ids):
+    object_ids = list(object_ids)
+    if object_ids:
+        tasks.enqueue_on_commit('search.sync', kind, object_ids)
+
+
+def rebuild(kind, queryset=None):
+    backend = get_backend()
+    with transaction.atomic():
+        backend.clear(kind)
+        batch, total = [], 0
+        for doc in documents(kind, queryset):
+            batch.append(doc)
+            if len(batch) >= SYNC_BATCH_SIZE:
+                backend.index(batch)
+                total += len(batch)
+                batch = []
+        backend.index(batch)
+    return total + len(batch)
+
+
+def search(query, kinds=SEARCH_KINDS, limit=20, offset=0):
+    ranked = get_backend().search(query, kinds, limit, offset)
+    objects = {}
+    for kind in {kind for kind, _, _ in ranked}:
+        ids = [object_id for hit_kind, object_id, _ in ranked if hit_kind == kind]
+        queryset = search_models()[kind].objects.all()
+        if kind == 'flight':
+            queryset = queryset.select_related('airline')
+        objects[kind] = queryset.in_bulk(ids)
+    return [
+        SearchHit(kind, objects[kind][object_id], score)
+        for kind, object_id, score in ranked if object_id in objects[kind]
+    ]
@@ -0,0 +1,79 @@
+import re
+
+AISLE = '-'
+LABEL_RE = re.compile(r'^(\d+)([A-Z])$')
+
+
+class SeatMap:
+    """Bitmap of taken seats; bit i is seat i counted row by row, front to back."""
+
+    def __init__(self, layout, seat_count, bitmap=b''):
+        self.letters = layout.replace(AISLE, '')
+        self.width = len(self.letters)
+        self.seat_count = seat_count
+        self.taken = int.from_bytes(bytes(bitmap or b''), 'little')
+        self.full = (1 << seat_count) - 1
+        self.blocks = []
+        offset = 0
+        for group in layout.split(AISLE):
+            if group:
+                self.blocks.append((offset, len(group)))
+            offset += len(group)
+
+    def to_bytes(self):
+        return self.taken.to_bytes((self.seat_count + 7) // 8, 'little')
+
+    def label(self, index):
+        return f'{index // self.width + 1}{self.letters[index % self.width]}'
+
+    def index(self, label):
+        match = LABEL_RE.match(label.strip().upper())
+        if not match or match.group(2) not in self.letters:
+            return None
+        index = (int(match.group(1)) - 1) * self.width + self.letters.index(match.group(2))
+        return index if 0 <= index < self.seat_count else None
+
+    def is_free(self, index):
+        return not self.taken >> index & 1
+
+    def first_free(self):
+        free = ~self.taken & self.full
+        if not free:
+            return None
+        return (free & -free).bit_length() - 1
+
+    def adjacent_block(self, size):
+        if size == 1:
+            first = self.first_free()
+            return None if first is None else [first]
+        block_mask = (1 << size) - 1
+        for row_start in range(0, self.seat_count, self.width):
+            if not ~(self.taken >> row_start) & ((1 << self.width) - 1):
+                continue
+            for offset, length in self.blocks:
+                for start in range(row_start + offset, row_start + offset + length - size + 1):
+                    if start + size <= self.seat_count and not self.taken & (block_mask << start):
+                        return list(range(start, start + size))
+        return None
+
+    def seats_for(self, size):
+        """An adjacent block if there is one, else the free seats closest together (across the aisle or rows)."""
+        block = self.adjacent_block(size)
+        if block is not None:
+            return block
+        free = [i for i in range(self.seat_count) if self.is_free(i)]
+        if len(free) < size:
+            return None
+        start = min(range(len(free) - size + 1), key=lambda i: free[i + size - 1] - free[i])
+        return free[start:start + size]
+
+    def take(self, indices):
+        for index in indices:
+            self.taken |= 1 << index
+
+    def release(self, indices):
+        for index in indices:
+            self.taken &= ~(1 << index)
+
+    def taken_labels(self):
+        return [self.label(i) for i in range(self.seat_count) if not self.is_free(i)]
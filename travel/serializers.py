@@ -1,5 +1,25 @@
 from rest_framework import serializers
-from .models import User, Hotel, Room, HotelReservation, RoomType, Amenity
+from .models import User, Hotel, Room, HotelReservation, FlightReservation, TourReservation, RoomType, Amenity
+from . import thumbnails
+from .trips import TRIP_KINDS
+
+class SparseFieldsMixin:
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        is_root = self.parent is None or (isinstance(self.parent, serializers.ListSerializer) and self.parent.parent is None)
+        if request is None or not is_root or not request.query_params.get('fields'):
+            return fields
+        wanted = {name.strip() for name in request.query_params['fields'].split(',')}
+        return {name: field for name, field in fields.items() if name in wanted} or fields
+
+class ThumbnailsField(serializers.Field):
+    def to_representation(self, digest):
+        urls = thumbnails.urls(digest)
+        request = self.context.get('request')
+        if urls is None or request is None:
+            return urls
+        return {size: {fmt: request.build_absolute_uri(url) for fmt, url in formats.items()} for size, formats in urls.items()}
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -7,13 +27,14 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'phone_number', 'is_customer', 'is_hotel_manager', 'is_airline_manager']
         read_only_fields = ['id']
 
-class HotelSerializer(serializers.ModelSerializer):
+class HotelSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     manager = UserSerializer(read_only=True)
+    thumbnails = ThumbnailsField(source='thumbnail_digest', read_only=True)
     
     class Meta:
         model = Hotel
-        fields = ['id', 'name', 'location_city', 'location_address', 'description', 'star_rating', 'contact_email', 'main_image', 'manager']
-        read_only_fields = ['id', 'manager']
+        fields = ['id', 'name', 'location_city', 'location_address', 'description', 'star_rating', 'contact_email', 'main_image', 'thumbnails', 'manager', 'min_price', 'max_price', 'room_count', 'review_count', 'average_rating']
+        read_only_fields = ['id', 'manager', 'min_price', 'max_price', 'room_count', 'review_count', 'average_rating']
 
 class AmenitySerializer(serializers.ModelSerializer):
     class Meta:
@@ -27,15 +48,15 @@ class RoomTypeSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description']
         read_only_fields = ['id']
 
-class RoomSerializer(serializers.ModelSerializer):
+class RoomSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     hotel = HotelSerializer(read_only=True)
     room_type = RoomTypeSerializer(read_only=True)
     amenities = AmenitySerializer(many=True, read_only=True)
     
     class Meta:
         model = Room
-        fields = ['id', 'hotel', 'room_type', 'room_number', 'capacity', 'price_per_night', 'amenities', 'is_available']
-        read_only_fields = ['id', 'hotel']
+        fields = ['id', 'hotel', 'room_type', 'room_number', 'capacity', 'price_per_night', 'amenities', 'is_available', 'review_count', 'average_rating']
+        read_only_fields = ['id', 'hotel', 'review_count', 'average_rating']
 
 class HotelReservationSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
@@ -43,5 +64,35 @@ class HotelReservationSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = HotelReservation
-        fields = ['id', 'user', 'room', 'reservation_date', 'payment_status']
-        read_only_fields = ['id', 'user', 'reservation_date']
\ No newline at end of file
+        fields = ['id', 'user', 'room', 'check_in', 'check_out', 'reservation_date', 'payment_status', 'hold_expires_at']
+        read_only_fields = ['id', 'user', 'reservation_date', 'hold_expires_at']
+
+    def validate(self, attrs):
+        if attrs['check_out'] <= attrs['check_in']:
+            raise serializers.ValidationError({'check_out': 'Check-out must be after check-in.'})
+        return attrs
+
+class FlightReservationSerializer(serializers.ModelSerializer):
+    user = UserSerializer(read_only=True)
+
+    class Meta:
+        model = FlightReservation
+        fields = ['id', 'user', 'flight', 'seat_number', 'reservation_date', 'payment_status', 'hold_expires_at']
+        read_only_fields = ['id', 'user', 'flight', 'seat_number', 'reservation_date', 'hold_expires_at']
+
+class TourReservationSerializer(serializers.ModelSerializer):
+    user = UserSerializer(read_only=True)
+
+    class Meta:
+        model = TourReservation
+        fields = ['id', 'user', 'tour', 'reservation_date', 'payment_status', 'hold_expires_at']
+        read_only_fields = ['id', 'user', 'tour', 'reservation_date', 'hold_expires_at']
+
+class TripSerializer(serializers.Serializer):
+    kind = serializers.ChoiceField(choices=TRIP_KINDS, read_only=True)
+    id = serializers.IntegerField(read_only=True)
+    reservation_date = serializers.DateTimeField(read_only=True)
+    payment_status = serializers.CharField(read_only=True)
+    title = serializers.CharField(read_only=True)
+    detail = serializers.CharField(read_only=True)
+    starts = serializers.DateField(read_only=True)
@@ -0,0 +1,274 @@
+import random
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import (
+    Room, Flight, Tour, HotelReservation, FlightReservation, TourReservation, Payment, IdempotencyKey,
+)
+from .seatmap import SeatMap
+
+LOCK_RETRIES = 5
+LOCK_RETRY_DELAY = 0.05
+
+
+class BookingError(Exception):
+    pass
+
+
+def retry_on_lock(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(LOCK_RETRIES):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                if 'locked' not in str(e) or attempt == LOCK_RETRIES - 1:
+                    raise
+                # Jitter keeps workers that collided once from retrying in lockstep.
+                time.sleep(LOCK_RETRY_DELAY * 2 ** attempt * random.uniform(0.5, 1.5))
+    return wrapper
+
+
+def hold_fields(hold_expires_at):
+    if hold_expires_at is None:
+        return {}
+    return {'hold_expires_at': hold_expires_at, 'payment_status': 'Unpaid'}
+
+
+@retry_on_lock
+def book_room(user, room_id, check_in, check_out, hold_expires_at=None):
+    with transaction.atomic():
+        # A no-op UPDATE locks the room row (SQLite: takes the write lock up front, where the busy timeout
+        # applies, instead of upgrading a read lock mid-transaction, which fails at once under contention).
+        if not Room.objects.filter(pk=room_id).update(is_available=F('is_available')):
+            raise BookingError("Room not found")
+        if not Room.objects.filter(pk=room_id).available(check_in, check_out).exists():
+            raise BookingError("Room is not available for the selected dates")
+        return HotelReservation.objects.create(
+            user_id=user.id, room_id=room_id, check_in=check_in, check_out=check_out, **hold_fields(hold_expires_at)
+        )
+
+
+def _allocate_seats(flight_id, party_size=1, seat_number=None):
+    # The conditional UPDATE takes the inventory and write-locks the row (SQLite: the database)
+    # before the seat map is read, so the read-modify-write below can't interleave with another booking.
+    updated = Flight.objects.filter(pk=flight_id, available_seats__gte=party_size).update(
+        available_seats=F('available_seats') - party_size
+    )
+    if not updated:
+        raise BookingError("No seats left on this flight")
+
+    flight = Flight.objects.only('seat_layout', 'seat_count', 'seat_map').get(pk=flight_id)
+    seat_map = SeatMap(flight.seat_layout, flight.seat_count, flight.seat_map)
+    if seat_number:
+        index = seat_map.index(seat_number)
+        if index is None or not seat_map.is_free(index):
+            raise BookingError(f"Seat {seat_number} is not available")
+        indices = [index]
+    else:
+        indices = seat_map.seats_for(party_size)
+        if indices is None:
+            raise BookingError(f"Not enough seats left for a party of {party_size}")
+    seat_map.take(indices)
+    Flight.objects.filter(pk=flight_id).update(seat_map=seat_map.to_bytes())
+    return [seat_map.label(index) for index in indices]
+
+
+@retry_on_lock
+def book_flight(user, flight_id, seat_number=None, hold_expires_at=None):
+    with transaction.atomic():
+        seat, = _allocate_seats(flight_id, seat_number=seat_number)
+        return FlightReservation.objects.create(
+            user_id=user.id, flight_id=flight_id, seat_number=seat, **hold_fields(hold_expires_at)
+        )
+
+
+@retry_on_lock
+def book_flight_party(user, flight_id, party_size, hold_expires_at=None):
+    with transaction.atomic():
+        seats = _allocate_seats(flight_id, party_size=party_size)
+        return [
+            FlightReservation.objects.create(
+                user_id=user.id, flight_id=flight_id, seat_number=seat, **hold_fields(hold_expires_at)
+            )
+            for seat in seats
+        ]
+
+
+@retry_on_lock
+def book_tour(user, tour_id, hold_expires_at=None):
+    with transaction.atomic():
+        updated = Tour.objects.filter(pk=tour_id, available_slots__gte=1).update(
+            available_slots=F('available_slots') - 1
+        )
+        if not updated:
+            raise BookingError("No slots left on this tour")
+        return TourReservation.objects.create(user_id=user.id, tour_id=tour_id, **hold_fields(hold_expires_at))
+
+
+def _delete_reservation(reservation):
+    # Only the cancel that actually deletes the row returns inventory, so a repeated cancel can't free it twice.
+    model = type(reservation)
+    return model.objects.filter(pk=reservation.pk).delete()[1].get(model._meta.label, 0)
+
+
+@retry_on_lock
+def cancel_room(reservation):
+    with transaction.atomic():
+        _delete_reservation(reservation)
+
+
+@retry_on_lock
+def cancel_flight(reservation):
+    with transaction.atomic():
+        if not _delete_reservation(reservation):
+            return
+        Flight.objects.filter(pk=reservation.flight_id).update(available_seats=F('available_seats') + 1)
+        flight = Flight.objects.only('seat_layout', 'seat_count', 'seat_map').get(pk=reservation.flight_id)
+        seat_map = SeatMap(flight.seat_layout, flight.seat_count, flight.seat_map)
+        index = seat_map.index(reservation.seat_number) if reservation.seat_number else None
+        if index is not None:
+            seat_map.release([index])
+            Flight.objects.filter(pk=flight.pk).update(seat_map=seat_map.to_bytes())
+
+
+@retry_on_lock
+def cancel_tour(reservation):
+    with transaction.atomic():
+        if _delete_reservation(reservation):
+            Tour.objects.filter(pk=reservation.tour_id).update(available_slots=F('available_slots') + 1)
+
+
+RESERVATION_MODELS = {'hotel': HotelReservation, 'flight': FlightReservation, 'tour': TourReservation}
+PAYMENT_FIELDS = {'hotel': 'hotel_reservation', 'flight': 'flight_reservation', 'tour': 'tour_reservation'}
+CANCELLERS = {'hotel': cancel_room, 'flight': cancel_flight, 'tour': cancel_tour}
+
+
+def reservation_amounts(kind, reservations):
+    if kind == 'hotel':
+        prices = dict(Room.objects.filter(pk__in={r.room_id for r in reservations}).values_list('pk', 'price_per_night'))
+        return [prices[r.room_id] * (r.check_out - r.check_in).days for r in reservations]
+    if kind == 'flight':
+        prices = dict(Flight.objects.filter(pk__in={r.flight_id for r in reservations}).values_list('pk', 'price'))
+        return [prices[r.flight_id] for r in reservations]
+    prices = dict(Tour.objects.filter(pk__in={r.tour_id for r in reservations}).values_list('pk', 'price'))
+    return [prices[r.tour_id] for r in reservations]
+
+
+def replay(user, kind, idempotency_key):
+    record = IdempotencyKey.objects.filter(user_id=user.id, key=idempotency_key).first()
+    if record is None:
+        return None
+    if record.kind != kind:
+        raise BookingError("This Idempotency-Key was already used for a different booking")
+    reservations = RESERVATION_MODELS[kind].objects.in_bulk(record.reservation_ids)
+    if len(reservations) < len(record.reservation_ids):
+        raise BookingError("The booking made with this Idempotency-Key has since been cancelled")
+    return [reservations[pk] for pk in record.reservation_ids]
+
+
+@retry_on_lock
+def book_and_charge(user, kind, book, idempotency_key=None, payment_method='Credit Card'):
+    """Run `book` and record an unpaid Payment per reservation in one transaction; settle_payments captures
+    them later. Returns (reservations, replayed), where replayed means the key had already been used."""
+    if idempotency_key:
+        previous = replay(user, kind, idempotency_key)
+        if previous is not None:
+            return previous, True
+    try:
+        with transaction.atomic():
+            reservations = book()
+            RESERVATION_MODELS[kind].objects.filter(pk__in=[r.pk for r in reservations]).update(payment_status='Unpaid')
+            for reservation in reservations:
+                reservation.payment_status = 'Unpaid'
+            Payment.objects.bulk_create(
+                Payment(**{PAYMENT_FIELDS[kind]: reservation}, amount=amount, payment_method=payment_method, status='Unpaid')
+                for reservation, amount in zip(reservations, reservation_amounts(kind, reservations))
+            )
+            if idempotency_key:
+                IdempotencyKey.objects.create(
+                    user_id=user.id, key=idempotency_key, kind=kind, reservation_ids=[r.pk for r in reservations]
+                )
+    except IntegrityError:
+        # A concurrent request with the same key committed first; everything above was rolled back.
+        previous = replay(user, kind, idempotency_key) if idempotency_key else None
+        if previous is None:
+            raise
+        return previous, True
+    return reservations, False
+
+
+def hold_expiry():
+    return timezone.now() + timedelta(minutes=getattr(settings, 'HOLD_TTL_MINUTES', 15))
+
+
+def confirm_hold(user, kind, reservation_ids):
+    """Turn the user's unexpired holds into reservations; run inside book_and_charge so a Payment is recorded."""
+    reservation_ids = set(reservation_ids)
+    model = RESERVATION_MODELS[kind]
+    held = model.objects.filter(pk__in=reservation_ids, user_id=user.id, hold_expires_at__gt=timezone.now())
+    if not reservation_ids or held.update(hold_expires_at=None) != len(reservation_ids):
+        raise BookingError("Hold not found or already expired")
+    return list(model.objects.filter(pk__in=reservation_ids).order_by('pk'))
+
+
+@retry_on_lock
+def release_room_holds(now, limit):
+    with transaction.atomic():
+        expired = HotelReservation.objects.filter(hold_expires_at__lte=now)
+        ids = list(expired.order_by('hold_expires_at').values_list('pk', flat=True)[:limit])
+        return expired.filter(pk__in=ids).delete()[1].get(HotelReservation._meta.label, 0)
+
+
+@retry_on_lock
+def release_flight_holds(flight_id, now):
+    with transaction.atomic():
+        # Write-lock the flight before reading its holds, as _allocate_seats does, so a booking can't interleave.
+        Flight.objects.filter(pk=flight_id).update(available_seats=F('available_seats'))
+        holds = list(
+            FlightReservation.objects.select_for_update()
+            .filter(flight_id=flight_id, hold_expires_at__lte=now).values_list('pk', 'seat_number')
+        )
+        if not holds:
+            return 0
+        flight = Flight.objects.only('seat_layout', 'seat_count', 'seat_map').get(pk=flight_id)
+        seat_map = SeatMap(flight.seat_layout, flight.seat_count, flight.seat_map)
+        indices = [seat_map.index(seat) for _, seat in holds if seat]
+        seat_map.release([index for index in indices if index is not None])
+        Flight.objects.filter(pk=flight_id).update(
+            available_seats=F('available_seats') + len(holds), seat_map=seat_map.to_bytes()
+        )
+        FlightReservation.objects.filter(pk__in=[pk for pk, _ in holds]).delete()
+        return len(holds)
+
+
+@retry_on_lock
+def release_tour_holds(tour_id, now):
+    with transaction.atomic():
+        Tour.objects.filter(pk=tour_id).update(available_slots=F('available_slots'))
+        ids = list(
+            TourReservation.objects.select_for_update()
+            .filter(tour_id=tour_id, hold_expires_at__lte=now).values_list('pk', flat=True)
+        )
+        if ids:
+            Tour.objects.filter(pk=tour_id).update(available_slots=F('available_slots') + len(ids))
+            TourReservation.objects.filter(pk__in=ids).delete()
+        return len(ids)
+
+
+def release_expired_holds(limit=500):
+    """Release up to `limit` expired holds per kind; inventory is returned per flight and tour in one UPDATE."""
+    now = timezone.now()
+    released = {'hotel': release_room_holds(now, limit), 'flight': 0, 'tour': 0}
+    for kind, field, release in (('flight', 'flight_id', release_flight_holds), ('tour', 'tour_id', release_tour_holds)):
+        expired = RESERVATION_MODELS[kind].objects.filter(hold_expires_at__lte=now).order_by('hold_expires_at')
+        for object_id in dict.fromkeys(expired.values_list(field, flat=True)[:limit]):
+            released[kind] += release(object_id, now)
+    return released
+
@@ -0,0 +1,174 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import autocomplete
+from . import cache as listing_cache
+from . import search
+from . import thumbnails
+from .models import Airline, Airport, Amenity, Hotel, Room, HotelReservation, Flight, FlightReservation, Tour, TourReservation, Review
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if connection.vendor == 'sqlite' and pragmas:
+        with connection.cursor() as cursor:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(pre_save, sender=Room)
+def remember_previous_hotel(sender, instance, **kwargs):
+    instance._previous_hotel_id = None
+    if instance.pk:
+        instance._previous_hotel_id = Room.objects.filter(pk=instance.pk).values_list('hotel_id', flat=True).first()
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def refresh_hotel_room_aggregates(sender, instance, **kwargs):
+    hotel_ids = {instance.hotel_id, getattr(instance, '_previous_hotel_id', None)} - {None}
+    Hotel.objects.filter(pk__in=hotel_ids).refresh_room_aggregates()
+
+
+def apply_review(review, delta):
+    if review['room_id']:
+        Room.objects.filter(pk=review['room_id']).apply_review(review['rating'], delta)
+        Hotel.objects.filter(rooms__id=review['room_id']).apply_review(review['rating'], delta)
+    if review['flight_id']:
+        Flight.objects.filter(pk=review['flight_id']).apply_review(review['rating'], delta)
+    if review['tour_id']:
+        Tour.objects.filter(pk=review['tour_id']).apply_review(review['rating'], delta)
+
+
+def review_snapshot(review):
+    return {'rating': int(review.rating), 'room_id': review.room_id, 'flight_id': review.flight_id, 'tour_id': review.tour_id}
+
+
+@receiver(pre_save, sender=Review)
+def remember_previous_review(sender, instance, **kwargs):
+    instance._previous_review = None
+    if instance.pk:
+        instance._previous_review = Review.objects.filter(pk=instance.pk).values(
+            'rating', 'room_id', 'flight_id', 'tour_id'
+        ).first()
+
+
+@receiver(post_save, sender=Review)
+def count_saved_review(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_review', None)
+    current = review_snapshot(instance)
+    if previous == current:
+        return
+    if previous:
+        apply_review(previous, -1)
+    apply_review(current, 1)
+
+
+@receiver(post_delete, sender=Review)
+def count_deleted_review(sender, instance, **kwargs):
+    apply_review(review_snapshot(instance), -1)
+
+
+def invalidate_listings(*namespaces):
+    transaction.on_commit(lambda: listing_cache.bump(*namespaces))
+
+
+LISTING_NAMESPACES = {
+    Hotel: ('hotel',),
+    Room: ('hotel',),
+    HotelReservation: ('hotel',),
+    Flight: ('flight',),
+    FlightReservation: ('flight',),
+    Tour: ('tour',),
+    TourReservation: ('tour',),
+    Review: ('hotel', 'flight', 'tour'),
+}
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_listing_cache(sender, **kwargs):
+    namespaces = LISTING_NAMESPACES.get(sender)
+    if namespaces:
+        invalidate_listings(*namespaces)
+
+
+SEARCH_DOCUMENTS = {Hotel: 'hotel', Tour: 'tour', Flight: 'flight'}
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def sync_search_document(sender, instance, **kwargs):
+    kind = SEARCH_DOCUMENTS.get(sender)
+    if kind:
+        search.sync_on_commit(kind, [instance.pk])
+    elif sender is Room:
+        search.sync_on_commit('hotel', {instance.hotel_id, getattr(instance, '_previous_hotel_id', None)} - {None})
+    elif sender is Amenity and kwargs.get('created') is False:
+        search.sync_on_commit('hotel', instance.rooms.values_list('hotel_id', flat=True).distinct())
+    elif sender is Airline and kwargs.get('created') is False:
+        search.sync_on_commit('flight', instance.flight_set.values_list('pk', flat=True))
+
+
+@receiver(m2m_changed, sender=Room.amenities.through)
+def sync_room_amenities(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            search.sync_on_commit('hotel', [instance.hotel_id])
+        return
+    if action in ('post_add', 'post_remove'):
+        rooms = Room.objects.filter(pk__in=pk_set)
+    elif action == 'pre_clear':
+        rooms = instance.rooms.all()
+    else:
+        return
+    search.sync_on_commit('hotel', rooms.values_list('hotel_id', flat=True).distinct())
+
+
+PLACE_FIELDS = {Hotel: ('hotel', ['location_city']), Flight: ('flight', ['origin', 'destination']), Tour: ('tour', ['destination'])}
+
+
+@receiver(pre_save)
+def remember_previous_places(sender, instance, **kwargs):
+    if sender in PLACE_FIELDS and instance.pk:
+        fields = PLACE_FIELDS[sender][1]
+        instance._previous_places = sender.objects.filter(pk=instance.pk).values_list(*fields).first() or ()
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def refresh_place_autocomplete(sender, instance, **kwargs):
+    if sender is Airport:
+        transaction.on_commit(lambda: autocomplete.places.invalidate('flight'))
+    elif sender in PLACE_FIELDS:
+        scope, fields = PLACE_FIELDS[sender]
+        current = {getattr(instance, field) for field in fields}
+        previous = set(getattr(instance, '_previous_places', ()))
+        if kwargs.get('created') is False and current == previous:
+            return
+        autocomplete.refresh_on_commit(scope, current | previous)
+
+
+THUMBNAIL_IMAGES = {Hotel: ('hotel', 'main_image'), Tour: ('tour', 'image')}
+
+
+@receiver(pre_save)
+def remember_previous_image(sender, instance, **kwargs):
+    if sender in THUMBNAIL_IMAGES and instance.pk:
+        field = THUMBNAIL_IMAGES[sender][1]
+        instance._previous_image = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+
+
+@receiver(post_save)
+def schedule_thumbnails(sender, instance, created, raw=False, **kwargs):
+    if sender not in THUMBNAIL_IMAGES or raw:
+        return
+    kind, field = THUMBNAIL_IMAGES[sender]
+    image = getattr(instance, field).name or None
+    previous = getattr(instance, '_previous_image', None) or None
+    if image != previous or (image and not instance.thumbnail_digest):
+        thumbnails.generate_on_commit(kind, instance.pk)
@@ -0,0 +1,121 @@
+import logging
+import os
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+LEASE = timedelta(minutes=5)
+RETRY_DELAY = timedelta(seconds=10)
+MAX_RETRY_DELAY = timedelta(hours=1)
+
+registry = {}
+
+
+def task(name, max_attempts=5):
+    def register(func):
+        registry[name] = (func, max_attempts)
+        func.task_name = name
+        return func
+    return register
+
+
+def eager():
+    return getattr(settings, 'TASKS_EAGER', False)
+
+
+def enqueue(name, *args, key=None, delay=None):
+    """Queue a registered task; with a key, later calls for the same key return the existing task instead."""
+    from .models import Task
+
+    func, max_attempts = registry[name]
+    if eager():
+        func(*args)
+        return None
+    values = {'name': name, 'args': list(args), 'max_attempts': max_attempts}
+    if delay:
+        values['run_at'] = timezone.now() + delay
+    if key is None:
+        return Task.objects.create(**values)
+    try:
+        with transaction.atomic():
+            return Task.objects.create(idempotency_key=key, **values)
+    except IntegrityError:
+        return Task.objects.get(idempotency_key=key)
+
+
+def enqueue_on_commit(name, *args, key=None, delay=None):
+    transaction.on_commit(lambda: enqueue(name, *args, key=key, delay=delay))
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(worker, limit=10):
+    from .models import Task
+
+    now = timezone.now()
+    abandoned = Task.objects.abandoned(now).update(
+        status=Task.FAILED, locked_until=None, finished_at=now,
+        last_error="The worker's lease ran out on the last attempt.",
+    )
+    if abandoned:
+        logger.error("%s tasks failed for good: their lease ran out on the last attempt", abandoned)
+    candidates = list(Task.objects.runnable(now).order_by('run_at', 'id').values_list('pk', flat=True)[:limit])
+    claimed = []
+    for pk in candidates:
+        # The conditional UPDATE is the lock: only one worker sees a row count of 1.
+        if Task.objects.runnable(now).filter(pk=pk).update(
+            status=Task.RUNNING, locked_by=worker, locked_until=now + LEASE, attempts=F('attempts') + 1,
+        ):
+            claimed.append(pk)
+    return list(Task.objects.filter(pk__in=claimed, locked_by=worker).order_by('run_at', 'id'))
+
+
+def retry_delay(attempts):
+    return min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+
+def run(task_row):
+    from .models import Task
+
+    entry = registry.get(task_row.name)
+    mine = Task.objects.filter(pk=task_row.pk, status=Task.RUNNING, locked_by=task_row.locked_by)
+    try:
+        if entry is None:
+            raise LookupError(f"No task registered as {task_row.name!r}")
+        entry[0](*task_row.args)
+    except Exception:
+        error = traceback.format_exc()
+        now = timezone.now()
+        if entry is None or task_row.attempts >= task_row.max_attempts:
+            logger.error("Task %s failed for good after %s attempts", task_row, task_row.attempts)
+            mine.update(status=Task.FAILED, last_error=error, locked_until=None, finished_at=now)
+        else:
+            logger.warning("Task %s failed, retrying", task_row, exc_info=True)
+            mine.update(
+                status=Task.QUEUED, last_error=error, locked_until=None,
+                run_at=now + retry_delay(task_row.attempts),
+            )
+        return False
+    mine.update(status=Task.DONE, locked_until=None, finished_at=timezone.now())
+    return True
+
+
+def run_pending(worker=None, limit=10):
+    worker = worker or worker_id()
+    tasks = claim(worker, limit)
+    return [run(task_row) for task_row in tasks]
+
+
+def purge(older_than):
+    from .models import Task
+
+    return Task.objects.filter(status=Task.DONE, finished_at__lt=timezone.now() - older_than).delete()[0]
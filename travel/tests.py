@@ -1,3 +1,804 @@
-from django.test import TestCase
+import os
+import random
+import re
+import tempfile
+from urllib.parse import parse_qs, urlencode, urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from datetime import date, timedelta
 
-# Create your tests here.
+from django.contrib import admin
+from django.core.cache import cache
+from django.db import connection, reset_queries, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+
+from .authentication import ClaimsRefreshToken
+from .middleware import ReplicaRoutingMiddleware
+from .models import (
+    Airline, Airport, Amenity, Flight, FlightReservation, Hotel, HotelReservation, Review, Room, RoomType, Task,
+    Tour, TourReservation, User,
+)
+from .pagination import encode_cursor
+from . import metrics, pagination, payments, routers, search as site_search
+from .seatmap import SeatMap
+from .serializers import AmenitySerializer
+from .services import BookingError, book_and_charge, book_flight, book_flight_party, book_room, book_tour, hold_expiry
+from .tasks import claim
+
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# Lookup tables that stay small enough for a scan to be cheaper than an index probe.
+SMALL_TABLES = {
+    'travel_airline', 'travel_airport', 'travel_amenity', 'travel_roomtype',
+    'django_content_type', 'auth_group', 'auth_permission',
+}
+# Case-insensitive and substring matches compile to LIKE, which can't use a b-tree index.
+KNOWN_SCANS = {
+    ('hotel_list', 'city'): "location_city icontains search",
+    ('tour_list', 'destination'): "destination icontains search",
+}
+# Views that return every row by design.
+UNBOUNDED_VIEWS = {
+    'user-list': "admin listing of all users",
+    'autocomplete': "first request per process builds the prefix index from GROUP BY scans",
+}
+ALIAS_RE = re.compile(r'"(\w+)" (\w+)\b(?! ON)')
+SCAN_RE = re.compile(r'^SCAN (\w+)')
+# 'subquery' is the derived table of a capped COUNT(*); the plan lines for its own query follow.
+DERIVED = {'CONSTANT', 'subquery'}
+LIMIT_RE = re.compile(r'\bLIMIT \d+(?: OFFSET \d+)?$')
+
+
+def url_patterns(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.namespace != 'admin':
+                yield from url_patterns(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name and not pattern.name.startswith('schema-'):
+            yield pattern
+
+
+def full_scans(sql):
+    """(table, plan line) for each whole-table scan in the query plan of a SELECT."""
+    aliases = {alias: table for table, alias in ALIAS_RE.findall(sql)}
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        plan = [row[-1] for row in cursor.fetchall()]
+    # A scan that already walks rows in the requested order stops at the LIMIT.
+    if LIMIT_RE.search(sql.rstrip()) and not any(detail.startswith('USE TEMP B-TREE') for detail in plan):
+        return
+    for detail in plan:
+        match = SCAN_RE.match(detail)
+        if match and 'USING' not in detail and 'VIRTUAL TABLE' not in detail and match.group(1) not in DERIVED:
+            yield aliases.get(match.group(1), match.group(1)), detail
+
+
+def make_inventory(user, seat_count=30):
+    now = timezone.now()
+    airline = Airline.objects.create(name='Test Air', country='-')
+    flight = Flight.objects.create(
+        flight_number='TST-1', origin='Tehran', destination='Paris', departure_time=now + timedelta(days=3),
+        arrival_time=now + timedelta(days=3, hours=5), airline=airline, seat_count=seat_count,
+        available_seats=seat_count, price=100,
+    )
+    hotel = Hotel.objects.create(
+        name='Test hotel', location_city='Paris', location_address='-', star_rating=4, manager=user,
+    )
+    room_type = RoomType.objects.create(name='Double')
+    room = Room.objects.create(hotel=hotel, room_type=room_type, room_number='1', capacity=2, price_per_night=80)
+    tour = Tour.objects.create(
+        name='Test tour', destination='Paris', start_date=now.date(), end_date=now.date() + timedelta(days=3),
+        price=300, max_participants=10, available_slots=10,
+    )
+    return {'airline': airline, 'flight': flight, 'hotel': hotel, 'room_type': room_type, 'room': room, 'tour': tour}
+
+
+@override_settings(CACHES=TEST_CACHES, TASKS_EAGER=False, METRICS_DIR='')
+class TravelTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('traveller', 'traveller@example.com', 'traveller')
+        cls.manager = User.objects.create_user(
+            'manager', 'manager@example.com', 'manager', is_hotel_manager=True, is_airline_manager=True,
+        )
+        cls.inventory = make_inventory(cls.manager)
+
+    def setUp(self):
+        cache.clear()
+
+    def api(self, user=None):
+        token = ClaimsRefreshToken.for_user(user or self.user).access_token
+        return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+
+class AvailabilityQueryTests(TravelTestCase):
+    def setUp(self):
+        super().setUp()
+        self.check_in = date.today() + timedelta(days=10)
+        self.check_out = self.check_in + timedelta(days=2)
+
+    def test_impossible_date_is_a_bad_request(self):
+        params = {'check_in': '2025-02-30', 'check_out': '2025-03-02'}
+        self.assertEqual(self.client.get(reverse('room-available'), params).status_code, 400)
+        self.assertEqual(self.client.get(reverse('room_search'), params).status_code, 400)
+        self.assertEqual(self.client.get(reverse('flight_list'), {'departure_from': '2025-13-01'}).status_code, 400)
+
+    def test_guests_must_be_a_positive_number(self):
+        for guests in ('many', '0', '-2'):
+            response = self.client.get(reverse('room-available'), {
+                'check_in': self.check_in, 'check_out': self.check_out, 'guests': guests,
+            })
+            self.assertEqual(response.status_code, 400, guests)
+
+    def test_city_matches_case_insensitively(self):
+        response = self.client.get(reverse('room-available'), {
+            'check_in': self.check_in, 'check_out': self.check_out, 'city': 'pARIS', 'guests': 2,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([room['id'] for room in response.json()['results']], [self.inventory['room'].pk])
+
+
+class SortTests(TravelTestCase):
+    def test_sort_applies_in_both_pagination_modes(self):
+        cheap = Hotel.objects.create(
+            name='Cheap', location_city='Paris', location_address='-', star_rating=2, manager=self.manager,
+        )
+        Room.objects.create(hotel=cheap, room_type=self.inventory['room_type'], room_number='1', price_per_night=20)
+        Room.objects.create(
+            hotel=self.inventory['hotel'], room_type=self.inventory['room_type'], room_number='2', price_per_night=10,
+        )
+        for params in ({'sort': 'price_asc'}, {'sort': 'price_asc', 'pagination': 'cursor'}):
+            results = self.client.get(reverse('hotel-list'), params).json()['results']
+            self.assertEqual([hotel['name'] for hotel in results], ['Test hotel', 'Cheap'], params)
+            rooms = self.client.get(reverse('room-list', args=[self.inventory['hotel'].pk]), params).json()
+            rooms = rooms['results'] if isinstance(rooms, dict) else rooms
+            self.assertEqual([room['price_per_night'] for room in rooms], ['10.00', '80.00'], params)
+
+
+    def test_unpriced_hotels_are_only_dropped_by_price_sorts(self):
+        Hotel.objects.create(name='Empty', location_city='Paris', location_address='-', star_rating=1, manager=self.manager)
+
+        def names(params):
+            return [hotel['name'] for hotel in self.client.get(reverse('hotel-list'), params).json()['results']]
+
+        self.assertEqual(names({'sort': 'rating_desc'}), ['Test hotel', 'Empty'])
+        self.assertEqual(names({'sort': 'price_asc'}), ['Test hotel'])
+        self.assertEqual(names({'sort': 'bogus'}), ['Test hotel', 'Empty'])
+
+
+class KeysetCursorTests(TravelTestCase):
+    def test_cursor_keeps_microseconds(self):
+        # Five bookings inside one millisecond: a millisecond cursor would skip or repeat some of them.
+        base = timezone.now().replace(microsecond=500000)
+        ids = []
+        for i in range(5):
+            reservation = book_tour(self.user, self.inventory['tour'].pk)
+            TourReservation.objects.filter(pk=reservation.pk).update(reservation_date=base + timedelta(microseconds=i))
+            ids.append(reservation.pk)
+        seen, url = [], reverse('trip-list') + '?count=2'
+        while url:
+            body = self.client.get(url, **self.api()).json()
+            seen += [trip['id'] for trip in body['results']]
+            url = body['next']
+        self.assertEqual(seen, ids[::-1])
+
+    def test_non_positive_count_falls_back_to_the_default_page_size(self):
+        for _ in range(10):
+            book_tour(self.user, self.inventory['tour'].pk)
+        book_flight(self.user, self.inventory['flight'].pk)
+        for count in ('0', '-1'):
+            body = self.client.get(reverse('trip-list'), {'count': count}, **self.api()).json()
+            self.assertEqual(len(body['results']), 10, count)
+            self.assertIsNotNone(body['next'], count)
+            body = self.client.get(reverse('hotel-list'), {'count': count, 'pagination': 'cursor'}).json()
+            self.assertEqual(len(body['results']), 1, count)
+
+    def test_tampered_cursor_starts_from_the_first_page(self):
+        book_tour(self.user, self.inventory['tour'].pk)
+        for values in (['not a date', 'tour', 1], [None, 'tour', 1], [1, 2], 'x', [{'a': 1}, 'tour', 1]):
+            response = self.client.get(
+                reverse('trip-list'), {'cursor': encode_cursor(values, 'n')}, **self.api()
+            )
+            self.assertEqual(response.status_code, 200, values)
+            self.assertEqual(len(response.json()['results']), 1, values)
+        response = self.client.get(reverse('hotel-list'), {'cursor': encode_cursor(['cheap', 'x'], 'p')})
+        self.assertEqual(response.status_code, 200)
+
+
+class ListingCacheTests(TravelTestCase):
+    def test_cached_bodies_keep_the_requested_host(self):
+        Hotel.objects.create(name='Other', location_city='Paris', location_address='-', star_rating=3, manager=self.manager)
+        params = {'count': 1, 'pagination': 'cursor'}
+        for host in ('localhost', '127.0.0.1', 'localhost'):
+            body = self.client.get(reverse('hotel-list'), params, HTTP_HOST=host).json()
+            self.assertEqual(urlsplit(body['next']).netloc, host)
+
+
+class CappedCountPaginatorTests(TravelTestCase):
+    @mock.patch.object(pagination, 'EXACT_COUNT_LIMIT', 5)
+    def test_every_row_is_reachable_past_the_limit(self):
+        Tour.objects.bulk_create(
+            Tour(name=f'Tour {i}', destination='Rome', start_date=date.today(), end_date=date.today(), price=10,
+                 max_participants=1, available_slots=1)
+            for i in range(30)
+        )
+        tours = Tour.objects.filter(destination='Rome').order_by('pk')
+        seen, number = [], 1
+        while True:
+            page = pagination.CappedCountPaginator(tours, 4, page_number=number).page(number)
+            seen += [tour.pk for tour in page]
+            if not page.has_next():
+                break
+            number += 1
+        self.assertEqual(seen, list(tours.values_list('pk', flat=True)))
+        self.assertEqual(pagination.CappedCountPaginator(tours, 4).count, 6)
+
+
+class SerializerQueryCountTests(TravelTestCase):
+    """Endpoints behind SerializerPrefetchMixin load nested users, hotels, room types and amenities in a fixed
+    number of queries, however many rows the page holds."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'staff', is_staff=True)
+        cls.amenities = [Amenity.objects.create(name=name) for name in ('Wifi', 'Pool')]
+        cls.check_in = date.today() + timedelta(days=20)
+
+    def add_rows(self, count):
+        hotel = self.inventory['hotel']
+        for _ in range(count):
+            number = Room.objects.count() + 1
+            manager = User.objects.create(username=f'manager-{number}', email=f'm{number}@example.com')
+            other = Hotel.objects.create(
+                name=f'Hotel {number}', location_city='Paris', location_address='-', star_rating=3, manager=manager,
+            )
+            for target in (hotel, other):
+                room = Room.objects.create(
+                    hotel=target, room_type=RoomType.objects.create(name=f'Type {number}-{target.pk}'),
+                    room_number=f'{number}', capacity=2, price_per_night=90,
+                )
+                room.amenities.set(self.amenities)
+            book_room(self.user, room.pk, self.check_in, self.check_in + timedelta(days=1))
+
+    def assertFlatQueries(self, expected, url, user=None, **params):
+        headers = self.api(user) if user else {}
+        for rows in (1, 4):
+            self.add_rows(rows)
+            cache.clear()
+            with self.assertNumQueries(expected):
+                response = self.client.get(url, params, **headers)
+            self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_hotel_list(self):
+        self.assertFlatQueries(2, reverse('hotel-list'))
+        self.assertFlatQueries(1, reverse('hotel-list'), pagination='cursor')
+
+    def test_hotel_detail(self):
+        self.assertFlatQueries(1, reverse('hotel-detail', args=[self.inventory['hotel'].pk]))
+
+    def test_room_list(self):
+        self.assertFlatQueries(2, reverse('room-list', args=[self.inventory['hotel'].pk]))
+
+    def test_room_list_keeps_amenities(self):
+        self.add_rows(2)
+        rooms = self.client.get(reverse('room-list', args=[self.inventory['hotel'].pk])).json()
+        expected = AmenitySerializer(self.amenities, many=True).data
+        self.assertEqual({room['id']: room['amenities'] for room in rooms}, {
+            room.pk: expected if room.amenities.exists() else []
+            for room in Room.objects.filter(hotel=self.inventory['hotel'])
+        })
+
+    def test_available_rooms(self):
+        check_out = self.check_in + timedelta(days=3)
+        self.assertFlatQueries(3, reverse('room-available'), check_in=self.check_in + timedelta(days=1),
+                               check_out=check_out, city='Paris')
+
+    def test_room_detail(self):
+        self.assertFlatQueries(2, reverse('room-detail', args=[self.inventory['room'].pk]))
+
+    def test_reservation_list(self):
+        response = self.assertFlatQueries(2, reverse('reservation-list'), user=self.user)
+        self.assertEqual(len(response.json()), HotelReservation.objects.filter(user=self.user).count())
+
+    def test_reservation_detail(self):
+        reservation = book_room(self.user, self.inventory['room'].pk, self.check_in, self.check_in + timedelta(days=1))
+        self.assertFlatQueries(2, reverse('reservation-detail', args=[reservation.pk]), user=self.user)
+
+    def test_users(self):
+        self.assertFlatQueries(1, reverse('user-list'), user=self.staff)
+        self.assertFlatQueries(1, reverse('user-detail', args=[self.user.pk]), user=self.staff)
+
+
+class SeatAllocationTests(TravelTestCase):
+    def seats(self, party_size):
+        return [r.seat_number for r in book_flight_party(self.user, self.inventory['flight'].pk, party_size)]
+
+    def test_party_wider_than_a_block_sits_across_the_aisle(self):
+        self.assertEqual(self.seats(4), ['1A', '1B', '1C', '1D'])
+        self.assertEqual(self.seats(6), ['1E', '1F', '2A', '2B', '2C', '2D'])
+
+    def test_malformed_seat_number_is_a_bad_request(self):
+        for seat_number in (12, 'C12', ['1A']):
+            response = self.client.post(
+                reverse('flight-reservation-create'), {'flight_id': self.inventory['flight'].pk, 'seat_number': seat_number},
+                content_type='application/json', **self.api(),
+            )
+            self.assertEqual(response.status_code, 400, seat_number)
+        self.assertFalse(FlightReservation.objects.exists())
+
+    def test_party_takes_the_closest_scattered_seats(self):
+        flight = self.inventory['flight']
+        seat_map = SeatMap(flight.seat_layout, flight.seat_count)
+        seat_map.take([i for i in range(flight.seat_count) if i not in (0, 7, 8, 20)])
+        Flight.objects.filter(pk=flight.pk).update(seat_map=seat_map.to_bytes(), available_seats=4)
+        self.assertEqual(self.seats(2), ['2B', '2C'])
+        self.assertEqual(self.seats(2), ['1A', '4C'])
+        with self.assertRaises(BookingError):
+            self.seats(1)
+
+
+@override_settings(METRICS_SLOW_REQUEST_MS=60_000)
+class AdminQueryCountTests(TravelTestCase):
+    """Every admin changelist, add and change page and autocomplete lookup runs the same number of queries
+    whether its tables hold `rows` or twice as many rows (keep `rows` under list_per_page)."""
+
+    rows = 25
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        cls.added = 0
+
+    def pages(self):
+        inventory = {**self.inventory, 'roomtype': self.inventory['room_type'], 'user': self.user}
+        for model, model_admin in admin.site._registry.items():
+            opts = model._meta
+            name = f'{opts.app_label}_{opts.model_name}'
+            yield f'{opts.model_name} changelist', reverse(f'admin:{name}_changelist')
+            yield f'{opts.model_name} add', reverse(f'admin:{name}_add')
+            obj = inventory.get(opts.model_name) or model._default_manager.order_by('pk').first()
+            if obj is not None:
+                yield f'{opts.model_name} change', reverse(f'admin:{name}_change', args=[obj.pk])
+            for field_name in model_admin.autocomplete_fields:
+                query = urlencode({'app_label': opts.app_label, 'model_name': opts.model_name, 'field_name': field_name})
+                yield f'{opts.model_name}.{field_name} autocomplete', f"{reverse('admin:autocomplete')}?{query}"
+
+    def measure(self):
+        counts = {}
+        for page, url in self.pages():
+            # The query log keeps the last 9000 entries, which the heaviest pages overflow across a round.
+            reset_queries()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, f'{page} {url}')
+            counts[page] = len(queries)
+        return counts
+
+    def grow(self):
+        start, self.added = self.added, self.added + self.rows
+        numbers = range(start + 1, self.added + 1)
+        flight, tour, room = self.inventory['flight'], self.inventory['tour'], self.inventory['room']
+        today = date.today()
+        room_types = RoomType.objects.bulk_create(RoomType(name=f'Type {i}') for i in numbers)
+        users = User.objects.bulk_create(User(username=f'admin-check-{i}', email=f'{i}@example.com') for i in numbers)
+        hotels = Hotel.objects.bulk_create(
+            Hotel(name=f'Hotel {i}', location_city='Paris', location_address='-', star_rating=3, manager=users[0])
+            for i in numbers
+        )
+        rooms = Room.objects.bulk_create(
+            Room(hotel=self.inventory['hotel'] if i % 2 else hotels[i], room_type=room_types[i], room_number=f'{n}',
+                 price_per_night=80)
+            for i, n in enumerate(numbers)
+        )
+        Flight.objects.bulk_create(
+            Flight(flight_number=f'ADM-{i}', origin='Tehran', destination='Paris', departure_time=flight.departure_time,
+                   arrival_time=flight.arrival_time, airline=self.inventory['airline'], seat_count=60,
+                   available_seats=60, price=100)
+            for i in numbers
+        )
+        Tour.objects.bulk_create(
+            Tour(name=f'Tour {i}', destination='Paris', start_date=tour.start_date, end_date=tour.end_date, price=300,
+                 max_participants=10, available_slots=10)
+            for i in numbers
+        )
+        owners = [self.user if i % 2 else users[i] for i in range(self.rows)]
+        HotelReservation.objects.bulk_create(
+            HotelReservation(user=owner, room=rooms[i], check_in=today, check_out=today + timedelta(days=2))
+            for i, owner in enumerate(owners)
+        )
+        FlightReservation.objects.bulk_create(
+            FlightReservation(user=owner, flight=flight, seat_number=f'{n}A') for owner, n in zip(owners, numbers)
+        )
+        TourReservation.objects.bulk_create(TourReservation(user=owner, tour=tour) for owner in owners)
+        Review.objects.bulk_create(
+            [Review(user=user, room=room, rating=4, comment='-') for user in users]
+            + [Review(user=user, review_type='FLIGHT', flight=flight, rating=3, comment='-') for user in users]
+            + [Review(user=user, review_type='TOUR', tour=tour, rating=5, comment='-') for user in users]
+        )
+        Task.objects.bulk_create(Task(name='admin.check', args={'n': i}) for i in numbers)
+
+    def test_admin_query_counts_do_not_grow_with_table_size(self):
+        self.client.force_login(self.admin)
+        self.grow()
+        before = self.measure()
+        self.grow()
+        after = self.measure()
+        for page, count in before.items():
+            self.assertLessEqual(after[page], count, f'{page} runs a query per row')
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+class QueryPlanTests(TravelTestCase):
+    """EXPLAIN QUERY PLAN over every query the site's views run: a full scan of a table that grows with
+    bookings fails, and so does any 5xx. Each request runs in a savepoint that is rolled back afterwards, so
+    deletes and bookings don't change the fixtures the next URL sees."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'admin', is_hotel_manager=True, is_airline_manager=True,
+        )
+        Airport.objects.create(code='IKA', name='Imam Khomeini', city='Tehran')
+        Airport.objects.create(code='CDG', name='Charles de Gaulle', city='Paris')
+        room, flight, tour = cls.inventory['room'], cls.inventory['flight'], cls.inventory['tour']
+        cls.check_in = date.today() + timedelta(days=10)
+        cls.hotel_reservation = HotelReservation.objects.create(
+            user=cls.admin, room=room, check_in=cls.check_in, check_out=cls.check_in + timedelta(days=3),
+        )
+        cls.flight_reservation = book_flight(cls.admin, flight.pk)
+        cls.tour_reservation = TourReservation.objects.create(user=cls.admin, tour=tour)
+        cls.tour_hold = book_tour(cls.admin, tour.pk, hold_expires_at=hold_expiry())
+        Review.objects.create(user=cls.admin, room=room, rating=4, comment='-')
+        Review.objects.create(user=cls.admin, review_type='FLIGHT', flight=flight, rating=3, comment='-')
+        Review.objects.create(user=cls.admin, review_type='TOUR', tour=tour, rating=5, comment='-')
+
+    def reads(self):
+        inventory = self.inventory
+        kwargs = {
+            'hotel_id': inventory['hotel'].pk, 'flight_id': inventory['flight'].pk, 'tour_id': inventory['tour'].pk,
+            'booking_id': self.hotel_reservation.pk, 'id': self.hotel_reservation.pk, 'type': 'hotel', 'kind': 'hotel',
+        }
+        pks = {
+            'user': self.admin.pk, 'hotel': inventory['hotel'].pk, 'room': inventory['room'].pk,
+            'flight': inventory['flight'].pk, 'reservation': self.hotel_reservation.pk,
+        }
+        stay = f'check_in={self.check_in}&check_out={self.check_in + timedelta(days=2)}'
+        variants = {
+            'flight_list': ['origin=Tehran&destination=Paris', 'sort=price_asc', 'sort=rating_desc'],
+            'hotel_list': ['city=Paris', 'sort=price_asc', 'sort=reviews_desc'],
+            'tour_list': ['destination=Paris', 'sort=price_asc', 'sort=rating_desc'],
+            'room_search': [f'destination=Paris&{stay}'],
+            'hotel-list': ['city=Paris', 'sort=price_asc&pagination=cursor', 'sort=reviews_desc&pagination=cursor'],
+            'room-available': [f'{stay}&city=Paris'],
+            'search': ['q=paris', 'q=plan+hot&type=hotel'],
+            'autocomplete': ['q=pa&scope=hotel', 'q=te&scope=flight'],
+        }
+        for pattern in url_patterns(get_resolver().url_patterns):
+            groups = pattern.pattern.regex.groupindex
+            params = {name: kwargs[name] for name in groups if name != 'pk'}
+            if 'pk' in groups:
+                params['pk'] = pks[pattern.name.split('-')[0]]
+            url = reverse(pattern.name, kwargs=params)
+            yield pattern.name, url
+            for query in variants.get(pattern.name, []):
+                yield pattern.name, f'{url}?{query}'
+
+        # Unfiltered changelists only run unbounded on fixture-sized tables, so check the date drill-downs.
+        for model, model_admin in admin.site._registry.items():
+            if model_admin.date_hierarchy:
+                opts = model._meta
+                url = reverse(f'admin:{opts.app_label}_{opts.model_name}_changelist')
+                yield f'admin:{opts.model_name}', f'{url}?{model_admin.date_hierarchy}__year={self.check_in.year}'
+
+    def writes(self):
+        """(method, url name, url, payload, signed in) for every endpoint that changes data."""
+        inventory = self.inventory
+        hotel, flight, tour = inventory['hotel'].pk, inventory['flight'].pk, inventory['tour'].pk
+        departure = timezone.now() + timedelta(days=5)
+        hotel_form = {
+            'name': 'Plan hotel', 'city': 'Paris', 'address': '-', 'description': '-', 'star_rating': 4,
+            'contact_email': 'plan@example.com',
+        }
+        flight_form = {
+            'flight_number': 'PLAN-2', 'origin': 'Tehran', 'destination': 'Paris',
+            'departure_time': departure.isoformat(), 'arrival_time': (departure + timedelta(hours=5)).isoformat(),
+            'airline': inventory['airline'].pk, 'seat_count': 60, 'available_seats': 60, 'price': 100,
+        }
+        tour_form = {
+            'name': 'Plan tour', 'description': '-', 'destination': 'Paris', 'start_date': self.check_in,
+            'end_date': self.check_in + timedelta(days=3), 'price': 300, 'max_participants': 10,
+            'available_slots': 10, 'guide_name': '-',
+        }
+        stay = {'check_in': str(self.check_in + timedelta(days=5)), 'check_out': str(self.check_in + timedelta(days=7))}
+        signup = {'username': 'newcomer', 'email': 'newcomer@example.com', 'password': 'newcomer'}
+        yield 'post', 'auth', reverse('auth'), {'username': 'admin', 'password': 'admin'}, False
+        yield 'post', 'auth', reverse('auth') + '?action=signup', signup, False
+        yield 'post', 'hotel_create', reverse('hotel_create'), hotel_form, True
+        yield 'post', 'hotel_update', reverse('hotel_update', args=[hotel]), hotel_form, True
+        yield 'post', 'hotel_delete', reverse('hotel_delete', args=[hotel]), {}, True
+        yield 'post', 'flight_create', reverse('flight_create'), flight_form, True
+        yield 'post', 'flight_update', reverse('flight_update', args=[flight]), flight_form, True
+        yield 'post', 'flight_delete', reverse('flight_delete', args=[flight]), {}, True
+        yield 'post', 'tour_create', reverse('tour_create'), tour_form, True
+        yield 'post', 'tour_update', reverse('tour_update', args=[tour]), tour_form, True
+        yield 'post', 'tour_delete', reverse('tour_delete', args=[tour]), {}, True
+        yield 'post', 'signup', reverse('signup'), signup, False
+        yield 'post', 'login', reverse('login'), {'username': 'admin', 'password': 'admin'}, False
+        yield 'patch', 'user-update', reverse('user-update', args=[self.admin.pk]), {'phone_number': '123'}, True
+        yield 'delete', 'user-delete', reverse('user-delete', args=[self.user.pk]), None, True
+        yield 'post', 'reservation-create', reverse('reservation-create'), {'room_id': inventory['room'].pk, **stay}, True
+        yield 'post', 'flight-reservation-create', reverse('flight-reservation-create'), {
+            'flight_id': flight, 'party_size': 2,
+        }, True
+        yield 'post', 'tour-reservation-create', reverse('tour-reservation-create'), {'tour_id': tour}, True
+        yield 'post', 'hold-create', reverse('hold-create', args=['hotel']), {'room_id': inventory['room'].pk, **stay}, True
+        yield 'post', 'hold-create', reverse('hold-create', args=['flight']), {'flight_id': flight}, True
+        yield 'post', 'hold-create', reverse('hold-create', args=['tour']), {'tour_id': tour}, True
+        yield 'post', 'hold-confirm', reverse('hold-confirm', args=['tour']), {'reservation_ids': [self.tour_hold.pk]}, True
+        for name, reservation in (
+            ('reservation-cancel', self.hotel_reservation), ('flight-reservation-cancel', self.flight_reservation),
+            ('tour-reservation-cancel', self.tour_reservation),
+        ):
+            yield 'post', name, reverse(name, args=[reservation.pk]), {}, True
+
+    def request(self, method, url, data=None, signed_in=True):
+        self.client.logout()
+        headers = {}
+        if signed_in:
+            self.client.force_login(self.admin)
+            session = self.client.session
+            session['user_id'] = self.admin.pk
+            session.save()
+            headers = self.api(self.admin)
+        if url.startswith('/api/') and data is not None:
+            headers['content_type'] = 'application/json'
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(self.client, method)(url, data, **headers)
+            transaction.set_rollback(True)
+        return response, queries
+
+    def assertIndexed(self, name, url, queries):
+        params = parse_qs(urlsplit(url).query)
+        if name in UNBOUNDED_VIEWS or any((name, param) in KNOWN_SCANS for param in params):
+            return
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            for table, detail in full_scans(sql):
+                self.assertIn(table, SMALL_TABLES, f'{name} {url}: full scan of {table} ({detail})\n  {sql}')
+
+    def test_reads_use_indexes(self):
+        for name, url in self.reads():
+            with self.subTest(url=url):
+                response, queries = self.request('get', url)
+                self.assertLess(response.status_code, 500)
+                self.assertIndexed(name, url, queries)
+
+    def test_writes_use_indexes(self):
+        for method, name, url, data, signed_in in self.writes():
+            with self.subTest(method=method, url=url):
+                response, queries = self.request(method, url, data, signed_in)
+                self.assertLess(response.status_code, 400, getattr(response, 'data', response.content[:500]))
+                self.assertIndexed(name, url, queries)
+
+
+class CancellationTests(TravelTestCase):
+    def test_cancelling_a_flight_returns_the_seat(self):
+        flight = self.inventory['flight']
+        reservation = book_flight(self.user, flight.pk, seat_number='2C')
+        url = reverse('flight-reservation-cancel', args=[reservation.pk])
+        self.assertEqual(self.client.post(url, **self.api()).status_code, 200)
+        flight.refresh_from_db()
+        self.assertEqual(flight.available_seats, flight.seat_count)
+        self.assertEqual(SeatMap(flight.seat_layout, flight.seat_count, flight.seat_map).taken_labels(), [])
+        self.assertEqual(self.client.post(url, **self.api()).status_code, 404)
+
+    def test_cancelling_a_tour_returns_the_slot(self):
+        tour = self.inventory['tour']
+        reservation = book_tour(self.user, tour.pk)
+        self.assertEqual(
+            self.client.post(reverse('tour-reservation-cancel', args=[reservation.pk]), **self.api()).status_code, 200
+        )
+        tour.refresh_from_db()
+        self.assertEqual(tour.available_slots, tour.max_participants)
+
+    def test_declined_payments_give_inventory_back(self):
+        class DecliningGateway:
+            def capture(self, charges):
+                return {reference: payments.Capture(False, 'declined') for reference in charges}
+
+        flight, tour = self.inventory['flight'], self.inventory['tour']
+        book_and_charge(self.user, 'flight', lambda: [book_flight(self.user, flight.pk)])
+        book_and_charge(self.user, 'tour', lambda: [book_tour(self.user, tour.pk)])
+        result = payments.settle_batch(10, DecliningGateway())
+        self.assertEqual((result.paid, result.failed), (0, 2))
+        flight.refresh_from_db()
+        tour.refresh_from_db()
+        self.assertEqual(flight.available_seats, flight.seat_count)
+        self.assertEqual(tour.available_slots, tour.max_participants)
+        self.assertFalse(FlightReservation.objects.exists() or TourReservation.objects.exists())
+
+    def test_replaying_a_cancelled_booking_is_rejected(self):
+        url, key = reverse('tour-reservation-create'), {'HTTP_IDEMPOTENCY_KEY': 'k1'}
+        tour = self.inventory['tour']
+        response = self.client.post(url, {'tour_id': tour.pk}, **self.api(), **key)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.client.post(url, {'tour_id': tour.pk}, **self.api(), **key).json()['id'],
+                         response.json()['id'])
+        cancel = reverse('tour-reservation-cancel', args=[response.json()['id']])
+        self.assertEqual(self.client.post(cancel, **self.api()).status_code, 200)
+        response = self.client.post(url, {'tour_id': tour.pk}, **self.api(), **key)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(TourReservation.objects.filter(tour=tour).exists())
+
+    def test_non_numeric_ids_are_bad_requests(self):
+        for name, field in (('reservation-create', 'room_id'), ('flight-reservation-create', 'flight_id'),
+                            ('tour-reservation-create', 'tour_id')):
+            response = self.client.post(reverse(name), {field: 'abc'}, **self.api())
+            self.assertEqual(response.status_code, 400, name)
+        response = self.client.post(reverse('hold-create', args=['tour']), {}, **self.api())
+        self.assertEqual(response.status_code, 400)
+
+    def test_only_the_owner_can_cancel(self):
+        reservation = book_tour(self.user, self.inventory['tour'].pk)
+        response = self.client.post(
+            reverse('tour-reservation-cancel', args=[reservation.pk]), **self.api(self.manager)
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(TourReservation.objects.filter(pk=reservation.pk).exists())
+
+
+class SearchRankingTests(TravelTestCase):
+    def test_best_match_wins_however_many_rows_match(self):
+        # The best hit is the oldest document, behind more matches than any recency window would rank.
+        best = Hotel.objects.create(
+            name='Spa Palace', location_city='Nice', location_address='-', star_rating=5, manager=self.manager,
+        )
+        Hotel.objects.bulk_create(
+            Hotel(name=f'Hotel {i}', description='Day spa', location_city='Nice', location_address='-',
+                  star_rating=3, manager=self.manager)
+            for i in range(2500)
+        )
+        site_search.rebuild('hotel')
+        hits = site_search.search('spa', ['hotel'], limit=5)
+        self.assertEqual(hits[0].object, best)
+        self.assertEqual(len(hits), 5)
+
+
+@override_settings(METRICS_ALLOWED_IPS=['127.0.0.1'])
+class MetricsTests(TravelTestCase):
+    def test_metrics_add_up_every_worker(self):
+        with tempfile.TemporaryDirectory() as directory, self.settings(METRICS_DIR=directory):
+            metrics.registry.reset()
+            other = metrics.Registry()
+            other.observe('tours/', 'GET', 200, 0.02, 3, 0.001, 512)
+            other.observe('tours/', 'GET', 200, 0.03, 3, 0.001, 512)
+            other.flush()
+            self.client.get(reverse('tour_list'))
+            body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('http_requests_total{route="tours/",method="GET",status="200"} 3', body)
+        self.assertIn('http_request_db_queries_count{route="tours/",method="GET"} 3', body)
+
+    def test_files_of_exited_workers_are_removed(self):
+        with tempfile.TemporaryDirectory() as directory, self.settings(METRICS_DIR=directory):
+            exited = metrics.Registry()
+            exited.observe('tours/', 'GET', 200, 0.02, 3, 0.001, 512)
+            exited.flush()
+            exited.discard()
+            killed = metrics.Registry()
+            # Above the kernel's largest pid, so no such process can be running.
+            killed.filename = f'{2 ** 22 + 1}-0.json'
+            killed.observe('tours/', 'GET', 200, 0.02, 3, 0.001, 512)
+            killed.flush()
+            body = self.client.get(reverse('metrics')).content.decode()
+            self.assertEqual(os.listdir(directory), [metrics.registry.filename])
+        self.assertNotIn('route="tours/"', body)
+
+    @override_settings(METRICS_ALLOWED_IPS=[])
+    def test_only_staff_can_read_metrics_by_default(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.client.force_login(User.objects.create_user('ops', 'ops@example.com', 'ops', is_staff=True))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+
+@mock.patch.object(routers, 'replicas', lambda: ['replica_1'])
+class ReplicaStickinessTests(TravelTestCase):
+    def request(self, method, user=None):
+        seen = {}
+
+        def view(request):
+            seen['replica_reads'] = routers.replica_reads.get()
+            return HttpResponse(status=201 if method == 'post' else 200)
+
+        request = getattr(RequestFactory(), method)('/api/reservation/', **(self.api(user) if user else {}))
+        ReplicaRoutingMiddleware(view)(request)
+        return seen['replica_reads']
+
+    def test_api_user_reads_the_primary_after_writing_without_cookies(self):
+        self.assertTrue(self.request('get', self.user))
+        self.assertFalse(self.request('post', self.user))
+        self.assertFalse(self.request('get', self.user))
+        self.assertTrue(self.request('get', self.manager))
+        self.assertTrue(self.request('get'))
+
+
+class TaskLeaseTests(TravelTestCase):
+    def test_expired_lease_is_reclaimed_only_while_attempts_remain(self):
+        expired = timezone.now() - timedelta(minutes=1)
+        retry = Task.objects.create(name='test.task', status=Task.RUNNING, attempts=2, locked_until=expired)
+        spent = Task.objects.create(name='test.task', status=Task.RUNNING, attempts=5, locked_until=expired)
+        self.assertEqual([task.pk for task in claim('worker-2')], [retry.pk])
+        spent.refresh_from_db()
+        self.assertEqual(spent.status, Task.FAILED)
+        self.assertEqual(spent.attempts, 5)
+        self.assertIsNotNone(spent.finished_at)
+
+
+@override_settings(CACHES=TEST_CACHES, TASKS_EAGER=False, METRICS_DIR='')
+class ConcurrentBookingTests(TransactionTestCase):
+    """Parallel bookings from threads, each on its own connection, must never oversell, and lock errors must
+    be retried rather than escape (anything but BookingError fails the test)."""
+
+    workers = 8
+    attempts = 60
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('stress', 'stress@example.com', 'stress')
+        self.inventory = make_inventory(self.user, seat_count=12)
+
+    def book_in_parallel(self, book):
+        def attempt(i):
+            try:
+                return book(i)
+            except BookingError:
+                return None
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return [result for result in pool.map(attempt, range(self.attempts)) if result is not None]
+
+    def test_flight_seats_are_not_oversold(self):
+        flight = self.inventory['flight']
+        booked = self.book_in_parallel(lambda i: book_flight(self.user, flight.pk))
+        flight.refresh_from_db()
+        reservations = FlightReservation.objects.filter(flight=flight)
+        self.assertEqual(len(booked), flight.seat_count)
+        self.assertEqual(reservations.count(), flight.seat_count)
+        self.assertEqual(flight.available_seats, 0)
+        self.assertEqual(reservations.values('seat_number').distinct().count(), flight.seat_count)
+
+    def test_tour_slots_are_not_oversold(self):
+        tour = self.inventory['tour']
+        booked = self.book_in_parallel(lambda i: book_tour(self.user, tour.pk))
+        tour.refresh_from_db()
+        self.assertEqual(len(booked), tour.max_participants)
+        self.assertEqual(TourReservation.objects.filter(tour=tour).count(), tour.max_participants)
+        self.assertEqual(tour.available_slots, 0)
+
+    def test_room_stays_never_overlap(self):
+        room = self.inventory['room']
+        first_night = date.today() + timedelta(days=30)
+        stays = [random.Random(i).randrange(14) for i in range(self.attempts)]
+
+        def book(i):
+            check_in = first_night + timedelta(days=stays[i])
+            return book_room(self.user, room.pk, check_in, check_in + timedelta(days=1 + i % 3))
+
+        booked = self.book_in_parallel(book)
+        reservations = sorted(HotelReservation.objects.filter(room=room), key=lambda r: r.check_in)
+        self.assertEqual(len(reservations), len(booked))
+        self.assertGreater(len(reservations), 0)
+        for earlier, later in zip(reservations, reservations[1:]):
+            self.assertLessEqual(earlier.check_out, later.check_in)
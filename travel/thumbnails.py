@@ -0,0 +1,104 @@
+import hashlib
+import logging
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from PIL import Image, ImageOps
+
+from . import cache as listing_cache
+from . import tasks
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_DIR = 'thumbnails'
+# Card images render at 320px wide; the 2x variant covers high-density screens.
+THUMBNAIL_SIZES = {'card': (320, 213), 'card_2x': (640, 426)}
+THUMBNAIL_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 6}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def image_fields():
+    from .models import Hotel, Tour
+    return {'hotel': (Hotel, 'main_image'), 'tour': (Tour, 'image')}
+
+
+def thumbnail_name(digest, size, fmt):
+    return f'{THUMBNAIL_DIR}/{digest[:2]}/{digest}-{size}.{fmt}'
+
+
+def urls(digest):
+    if not digest:
+        return None
+    return {
+        size: {fmt: default_storage.url(thumbnail_name(digest, size, fmt)) for fmt in THUMBNAIL_FORMATS}
+        for size in THUMBNAIL_SIZES
+    }
+
+
+def file_digest(field_file):
+    sha = hashlib.sha256()
+    field_file.open('rb')
+    try:
+        for chunk in field_file.chunks():
+            sha.update(chunk)
+    finally:
+        field_file.close()
+    return sha.hexdigest()
+
+
+def render(field_file, digest, force=False):
+    """Write every size and format for one source image; names are content-addressed, so existing files are reused."""
+    names = [
+        (size, fmt, thumbnail_name(digest, size, fmt)) for size in THUMBNAIL_SIZES for fmt in THUMBNAIL_FORMATS
+    ]
+    missing = [entry for entry in names if force or not default_storage.exists(entry[2])]
+    if not missing:
+        return 0
+    field_file.open('rb')
+    try:
+        source = ImageOps.exif_transpose(Image.open(field_file))
+        source.load()
+    finally:
+        field_file.close()
+    for size, fmt, name in missing:
+        image = ImageOps.fit(source, THUMBNAIL_SIZES[size], Image.LANCZOS)
+        pil_format, options = THUMBNAIL_FORMATS[fmt]
+        if pil_format == 'JPEG' or image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGB')
+        buffer = BytesIO()
+        image.save(buffer, pil_format, **options)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        default_storage.save(name, ContentFile(buffer.getvalue()))
+    return len(missing)
+
+
+@tasks.task('thumbnails.generate')
+def generate(kind, pk, force=False):
+    model, field = image_fields()[kind]
+    obj = model.objects.filter(pk=pk).only(field, 'thumbnail_digest').first()
+    if obj is None:
+        return None
+    image = getattr(obj, field)
+    digest = ''
+    if image:
+        try:
+            digest = file_digest(image)
+            render(image, digest, force)
+        except (OSError, Image.DecompressionBombError):
+            logger.warning("Could not build thumbnails for %s %s from %s", kind, pk, image.name, exc_info=True)
+            digest = ''
+    # Only record the digest if the image wasn't replaced while we were rendering.
+    same_image = Q(**{field: image.name}) if image else Q(**{field: ''}) | Q(**{f'{field}__isnull': True})
+    updated = model.objects.filter(same_image, pk=pk).exclude(thumbnail_digest=digest).update(thumbnail_digest=digest)
+    if updated:
+        listing_cache.bump(kind)
+    return digest
+
+
+def generate_on_commit(kind, pk):
+    tasks.enqueue_on_commit('thumbnails.generate', kind, pk)
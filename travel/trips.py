@@ -0,0 +1,33 @@
+from django.db.models import CharField, F, Value
+from django.db.models.functions import Concat, TruncDate
+
+from .models import FlightReservation, HotelReservation, TourReservation
+from .pagination import MergedQuerySet
+
+TRIP_KINDS = ('hotel', 'flight', 'tour')
+TRIP_ORDERING = ['-reservation_date', '-kind', '-id']
+TRIP_FIELDS = ('kind', 'id', 'reservation_date', 'payment_status', 'title', 'detail', 'starts')
+
+
+def _trip_rows(model, kind, user_id, title, detail, starts):
+    return model.objects.filter(user_id=user_id).annotate(
+        kind=Value(kind, output_field=CharField()), title=title, detail=detail, starts=starts,
+    ).values(*TRIP_FIELDS)
+
+
+def trips_for(user_id):
+    return MergedQuerySet(
+        _trip_rows(
+            HotelReservation, 'hotel', user_id,
+            F('room__hotel__name'), Concat(Value('Room '), 'room__room_number', output_field=CharField()), F('check_in'),
+        ),
+        _trip_rows(
+            FlightReservation, 'flight', user_id,
+            F('flight__flight_number'), Concat('flight__origin', Value(' → '), 'flight__destination', output_field=CharField()),
+            TruncDate('flight__departure_time'),
+        ),
+        _trip_rows(
+            TourReservation, 'tour', user_id,
+            F('tour__name'), F('tour__destination'), F('tour__start_date'),
+        ),
+    )
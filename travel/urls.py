@@ -1,4 +1,4 @@
-from django.urls import path, re_path
+from django.urls import path
 from . import views
 
 urlpatterns = [
@@ -8,11 +8,11 @@ urlpatterns = [
     path('hotels/', views.hotel_list, name='hotel_list'),
     path('flights/', views.flight_list, name='flight_list'),
     path('tours/', views.tour_list, name='tour_list'),
+    path('rooms/search/', views.room_search, name='room_search'),
+    path('search/', views.search, name='search'),
+    path('metrics', views.metrics, name='metrics'),
     path('profile/', views.user_profile, name='profile'),
 
-    re_path(r'^bookings/hotels/(?P<page>\d+)/$', views.hotel_list, name='hotel_list_page'),
-    re_path(r'^bookings/flights/(?P<page>\d+)/$', views.flight_list, name='flight_list_page'),
-    
     path('hotels/create/', views.hotel_create, name='hotel_create'),
     path('hotels/<int:hotel_id>/edit/', views.hotel_update, name='hotel_update'),
     path('hotels/<int:hotel_id>/delete/', views.hotel_delete, name='hotel_delete'),
@@ -40,12 +40,23 @@ urlpatterns = [
     path('api/hotel/', views.HotelListView.as_view(), name='hotel-list'),
     path('api/hotel/<int:pk>/', views.HotelDetailView.as_view(), name='hotel-detail'),
     path('api/hotel/<int:hotel_id>/room/', views.RoomListView.as_view(), name='room-list'),
+    path('api/room/available/', views.AvailableRoomListView.as_view(), name='room-available'),
+    path('api/autocomplete/', views.AutocompleteView.as_view(), name='autocomplete'),
     path('api/room/<int:pk>/', views.RoomDetailView.as_view(), name='room-detail'),
     
+    path('api/flight/<int:pk>/seats/', views.FlightSeatMapView.as_view(), name='flight-seat-map'),
+
     # Reservation Management
     path('api/reservation/', views.ReservationListView.as_view(), name='reservation-list'),
+    path('api/trips/', views.TripListView.as_view(), name='trip-list'),
     path('api/reservation/create/', views.ReservationCreateView.as_view(), name='reservation-create'),
+    path('api/reservation/flight/create/', views.FlightReservationCreateView.as_view(), name='flight-reservation-create'),
+    path('api/reservation/tour/create/', views.TourReservationCreateView.as_view(), name='tour-reservation-create'),
+    path('api/holds/<str:kind>/', views.HoldCreateView.as_view(), name='hold-create'),
+    path('api/holds/<str:kind>/confirm/', views.HoldConfirmView.as_view(), name='hold-confirm'),
     path('api/reservation/<int:id>/cancel/', views.ReservationCancelView.as_view(), name='reservation-cancel'),
+    path('api/reservation/flight/<int:id>/cancel/', views.ReservationCancelView.as_view(kind='flight'), name='flight-reservation-cancel'),
+    path('api/reservation/tour/<int:id>/cancel/', views.ReservationCancelView.as_view(kind='tour'), name='tour-reservation-cancel'),
     path('api/reservation/<int:pk>/', views.ReservationDetailView.as_view(), name='reservation-detail'),
 ]
 
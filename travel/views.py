@@ -1,21 +1,46 @@
+import logging
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.core.paginator import Paginator
 from django.db.models import Q
-from datetime import datetime
+from django.utils.dateparse import parse_date
+from django.utils import timezone
+from datetime import datetime, time, timedelta
 from django.contrib.auth.hashers import make_password, check_password
-from .models import User, Hotel, Flight, Room, HotelReservation, FlightReservation, TourReservation, Tour, Airline
+from django.conf import settings
+from django.core.exceptions import BadRequest, ObjectDoesNotExist
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from .models import User, Hotel, Flight, Room, HotelReservation, FlightReservation, TourReservation, Tour, Airline, Airport, Payment
 from rest_framework import generics, status
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.views import APIView
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from .models import User, Hotel, Room, HotelReservation
-from .serializers import UserSerializer, HotelSerializer, RoomSerializer, HotelReservationSerializer
+from .serializers import (
+    UserSerializer, HotelSerializer, RoomSerializer, HotelReservationSerializer,
+    FlightReservationSerializer, TourReservationSerializer, TripSerializer,
+)
+from .services import (
+    BookingError, CANCELLERS, RESERVATION_MODELS, book_and_charge, book_room, book_flight, book_flight_party,
+    book_tour, confirm_hold, hold_expiry,
+)
+from .seatmap import LABEL_RE, SeatMap
+from .authentication import ClaimsRefreshToken
 from .permissions import IsAdmin, IsAdminOrReadOnly, IsOwnerOrAdmin
-from travel import serializers
+from .pagination import KeysetModeMixin, KeysetPagination, keyset_paginate, keyset_querystring
+from .prefetch import SerializerPrefetchMixin
+from .fast_serializers import FlatListMixin
+from . import cache as listing_cache
+from .cache import CachedResponseMixin
+from .trips import TRIP_ORDERING, trips_for
+from . import search as site_search
+from . import autocomplete
+from . import notifications
+from . import metrics as request_metrics
+
+logger = logging.getLogger(__name__)
 
 def user_bookings(request):
     user_id = request.session.get('user_id')
@@ -23,14 +48,12 @@ def user_bookings(request):
         messages.error(request, 'Please login to view your bookings.')
         return redirect('auth')
 
-    hotel_reservations = HotelReservation.objects.filter(user_id=user_id).select_related('room__hotel')
-    flight_reservations = FlightReservation.objects.filter(user_id=user_id).select_related('flight__airline')
-    tour_reservations = TourReservation.objects.filter(user_id=user_id).select_related('tour')
+    page_obj = keyset_paginate(trips_for(user_id), TRIP_ORDERING, request.GET.get('cursor'), 10)
 
     context = {
-        'hotel_reservations': hotel_reservations,
-        'flight_reservations': flight_reservations,
-        'tour_reservations': tour_reservations,
+        'trips': page_obj.object_list,
+        'page_obj': page_obj,
+        'querystring': keyset_querystring(request),
     }
 
     return render(request, 'listings/booking_list.html', context)
@@ -52,46 +75,87 @@ def booking_detail(request, type, booking_id):
         booking = get_object_or_404(TourReservation, id=booking_id, user_id=user_id)
     else:
         messages.error(request, 'Invalid booking type.')
-        return redirect('user_bookings')
+        return redirect('booking_list')
 
     return render(request, 'listings/booking_detail.html', {'booking': booking, 'type': type})
 
+def place_filter(field, term):
+    places = Airport.objects.places_for(term)
+    if not places:
+        return Q(**{f'{field}__icontains': term})
+    places.update((term.strip(), term.strip().upper(), term.strip().title()))
+    return Q(**{f'{field}__in': places})
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+def query_date(params, name, error=BadRequest):
+    # parse_date returns None for malformed input but raises on well-formed impossible dates like 2025-02-30.
+    try:
+        return parse_date(params.get(name) or '')
+    except ValueError:
+        raise error(f"{name} is not a valid date")
+
+def query_count(params, name, default=1, error=BadRequest):
+    value = params.get(name) or default
+    if value is None:
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise error(f"{name} must be a number")
+    if value < 1:
+        raise error(f"{name} must be at least 1")
+    return value
+
 def flight_list(request):
     flights = Flight.objects.all()
 
     origin = request.GET.get('origin')
     destination = request.GET.get('destination')
-    passengers = request.GET.get('passengers')
+    passengers = query_count(request.GET, 'passengers', default=None)
     sort = request.GET.get('sort', 'date')
-    page_number = request.GET.get('page', 1)
+    cursor = request.GET.get('cursor')
+    with_count = request.GET.get('with_count') == '1'
+
+    departure_from = query_date(request.GET, 'departure_from')
+    departure_to = query_date(request.GET, 'departure_to')
 
     if origin:
-        flights = flights.filter(origin__icontains=origin)
+        flights = flights.filter(place_filter('origin', origin))
     if destination:
-        flights = flights.filter(destination__icontains=destination)
+        flights = flights.filter(place_filter('destination', destination))
+    if departure_from:
+        flights = flights.filter(departure_time__gte=start_of_day(departure_from))
+    if departure_to:
+        flights = flights.filter(departure_time__lt=start_of_day(departure_to + timedelta(days=1)))
     if passengers:
         flights = flights.filter(available_seats__gte=passengers)
 
     if sort == 'price_asc':
-        flights = flights.order_by('price')
+        ordering = ['price', 'id']
     elif sort == 'price_desc':
-        flights = flights.order_by('-price')
+        ordering = ['-price', '-id']
+    elif sort == 'rating_desc':
+        ordering = ['-average_rating', '-id']
     else:
-        flights = flights.order_by('departure_time')
+        ordering = ['departure_time', 'id']
 
-    paginator = Paginator(flights, 5)
-    try:
-        page_obj = paginator.page(page_number)
-    except:
-        page_obj = paginator.page(1)
+    page_obj = listing_cache.get_or_compute(
+        'flight', 'flight_list', request.GET,
+        lambda: keyset_paginate(flights, ordering, cursor, 5, with_count=with_count),
+    )
 
     context = {
         'flights': page_obj.object_list,
         'page_obj': page_obj,
+        'querystring': keyset_querystring(request),
         'search_params': {
             'origin': origin,
             'destination': destination,
             'passengers': passengers,
+            'departure_from': request.GET.get('departure_from'),
+            'departure_to': request.GET.get('departure_to'),
             'sort': sort
         }
     }
@@ -105,24 +169,28 @@ def hotel_list(request):
         hotels = hotels.filter(location_city__icontains=city)
 
     sort = request.GET.get('sort', 'default')
+    if sort in ('price_asc', 'price_desc'):
+        hotels = hotels.filter(min_price__isnull=False)
     if sort == 'price_asc':
-        hotels = hotels.order_by('rooms__price_per_night').distinct()
+        ordering = ['min_price', 'id']
     elif sort == 'price_desc':
-        hotels = hotels.order_by('-rooms__price_per_night').distinct()
+        ordering = ['-min_price', '-id']
     elif sort == 'rating_desc':
-        hotels = hotels.order_by('-star_rating')
-
-    page_number = request.GET.get('page', 1)
-    paginator = Paginator(hotels, 3)
+        ordering = ['-star_rating', '-id']
+    elif sort == 'reviews_desc':
+        ordering = ['-average_rating', '-id']
+    else:
+        ordering = ['id']
 
-    try:
-        page_obj = paginator.page(page_number)
-    except:
-        page_obj = paginator.page(1)
+    page_obj = listing_cache.get_or_compute(
+        'hotel', 'hotel_list', request.GET,
+        lambda: keyset_paginate(hotels, ordering, request.GET.get('cursor'), 3, with_count=request.GET.get('with_count') == '1'),
+    )
 
     context = {
         'hotels': page_obj.object_list,
         'page_obj': page_obj,
+        'querystring': keyset_querystring(request),
         'search_params': {
             'city': city,
             'sort': sort
@@ -135,27 +203,28 @@ def tour_list(request):
 
     destination = request.GET.get('destination')
     sort = request.GET.get('sort', 'default')
-    page_number = request.GET.get('page', 1)
 
     if destination:
         tours = tours.filter(destination__icontains=destination)
 
     if sort == 'price_asc':
-        tours = tours.order_by('price')
+        ordering = ['price', 'id']
     elif sort == 'price_desc':
-        tours = tours.order_by('-price')
+        ordering = ['-price', '-id']
     elif sort == 'rating_desc':
-        tours = tours.order_by('-rating')
+        ordering = ['-average_rating', '-id']
+    else:
+        ordering = ['id']
 
-    paginator = Paginator(tours, 4)
-    try:
-        page_obj = paginator.page(page_number)
-    except:
-        page_obj = paginator.page(1)
+    page_obj = listing_cache.get_or_compute(
+        'tour', 'tour_list', request.GET,
+        lambda: keyset_paginate(tours, ordering, request.GET.get('cursor'), 4, with_count=request.GET.get('with_count') == '1'),
+    )
 
     context = {
         'tours': page_obj.object_list,
         'page_obj': page_obj,
+        'querystring': keyset_querystring(request),
         'search_params': {
             'destination': destination,
             'sort': sort
@@ -163,6 +232,67 @@ def tour_list(request):
     }
     return render(request, 'listings/tour_list.html', context)
 
+def room_search(request):
+    city = request.GET.get('destination')
+    guests = query_count(request.GET, 'guests')
+    check_in = query_date(request.GET, 'check_in')
+    check_out = query_date(request.GET, 'check_out')
+    sort = request.GET.get('sort', 'price_asc')
+
+    rooms = Room.objects.none()
+    if check_in and check_out and check_out > check_in:
+        rooms = Room.objects.available(check_in, check_out, guests=guests, city=city).select_related('hotel')
+        if sort == 'price_desc':
+            rooms = rooms.order_by('-price_per_night')
+        elif sort == 'rating_desc':
+            rooms = rooms.order_by('-hotel__star_rating', 'price_per_night')
+        else:
+            rooms = rooms.order_by('price_per_night')
+    elif check_in or check_out:
+        messages.error(request, 'Check-out must be after check-in.')
+
+    context = {
+        'results': rooms[:50],
+        'search_params': {
+            'destination': city,
+            'guests': guests,
+            'check_in': request.GET.get('check_in'),
+            'check_out': request.GET.get('check_out'),
+            'sort': sort
+        }
+    }
+    return render(request, 'listings/search_results.html', context)
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    kinds = [kind for kind in request.GET.getlist('type') if kind in site_search.SEARCH_KINDS] or site_search.SEARCH_KINDS
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    page_size = 20
+
+    hits = site_search.search(query, kinds, limit=page_size + 1, offset=(page - 1) * page_size) if query else []
+    query_params = request.GET.copy()
+    query_params.pop('page', None)
+    context = {
+        'mode': 'text',
+        'hits': hits[:page_size],
+        'query': query,
+        'all_kinds': site_search.SEARCH_KINDS,
+        'kinds': kinds,
+        'page': page,
+        'has_next': len(hits) > page_size,
+        'querystring': query_params.urlencode(),
+    }
+    return render(request, 'listings/search_results.html', context)
+
+def metrics(request):
+    allowed = request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', ()) or request.user.is_staff
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(request_metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 def user_profile(request):
     user_id = request.session.get('user_id')
     if not user_id:
@@ -266,7 +396,7 @@ def hotel_update(request, hotel_id):
         hotel.contact_email = request.POST.get('contact_email')
         hotel.save()
         messages.success(request, "Hotel updated successfully.")
-        return redirect('hotel_detail', hotel_id=hotel.id)
+        return redirect('hotel_list')
 
     return render(request, 'listings/hotel_create.html', {'hotel': hotel})
 
@@ -414,22 +544,22 @@ class StandardResultsSetPagination(PageNumberPagination):
     max_page_size = 100
 
 # User Management
-class UserListView(generics.ListAPIView):
+class UserListView(SerializerPrefetchMixin, generics.ListAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAdmin]
 
-class UserDetailView(generics.RetrieveAPIView):
+class UserDetailView(SerializerPrefetchMixin, generics.RetrieveAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAdmin]
 
-class UserDeleteView(generics.DestroyAPIView):
+class UserDeleteView(SerializerPrefetchMixin, generics.DestroyAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAdmin]
 
-class UserUpdateView(generics.UpdateAPIView):
+class UserUpdateView(SerializerPrefetchMixin, generics.UpdateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsOwnerOrAdmin]
@@ -444,7 +574,7 @@ class SignupView(APIView):
             user = serializer.save()
             user.set_password(request.data['password'])
             user.save()
-            refresh = RefreshToken.for_user(user)
+            refresh = ClaimsRefreshToken.for_user(user)
             return Response({
                 'refresh': str(refresh),
                 'access': str(refresh.access_token),
@@ -459,7 +589,7 @@ class LoginView(APIView):
         password = request.data.get('password')
         user = authenticate(username=username, password=password)
         if user:
-            refresh = RefreshToken.for_user(user)
+            refresh = ClaimsRefreshToken.for_user(user)
             return Response({
                 'refresh': str(refresh),
                 'access': str(refresh.access_token),
@@ -467,69 +597,270 @@ class LoginView(APIView):
         return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
 
 # Hotel Management
-class HotelListView(generics.ListAPIView):
-    queryset = Hotel.objects.all()
+class HotelListView(CachedResponseMixin, FlatListMixin, SerializerPrefetchMixin, KeysetModeMixin, generics.ListAPIView):
+    queryset = Hotel.objects.order_by('id')
+    cache_namespace = 'hotel'
     serializer_class = HotelSerializer
     permission_classes = [AllowAny]
     pagination_class = StandardResultsSetPagination
+    keyset_orderings = {
+        'default': ['id'],
+        'price_asc': ['min_price', 'id'],
+        'price_desc': ['-min_price', '-id'],
+        'rating_desc': ['-star_rating', '-id'],
+        'reviews_desc': ['-average_rating', '-id'],
+    }
 
-class HotelDetailView(generics.RetrieveAPIView):
+    def get_queryset(self):
+        hotels = super().get_queryset()
+        city = self.request.query_params.get('city')
+        if city:
+            hotels = hotels.filter(location_city=city)
+        if 'min_price' in (field.lstrip('-') for field in self.get_keyset_ordering()):
+            # Hotels without rooms have no price to sort by.
+            hotels = hotels.filter(min_price__isnull=False)
+        return hotels
+
+class HotelDetailView(CachedResponseMixin, SerializerPrefetchMixin, generics.RetrieveAPIView):
     queryset = Hotel.objects.all()
+    cache_namespace = 'hotel'
     serializer_class = HotelSerializer
     permission_classes = [AllowAny]
 
-class RoomListView(generics.ListAPIView):
+class RoomListView(FlatListMixin, SerializerPrefetchMixin, KeysetModeMixin, generics.ListAPIView):
     serializer_class = RoomSerializer
     permission_classes = [AllowAny]
+    keyset_orderings = {
+        'default': ['id'],
+        'price_asc': ['price_per_night', 'id'],
+        'price_desc': ['-price_per_night', '-id'],
+        'reviews_desc': ['-average_rating', '-id'],
+    }
     
     def get_queryset(self):
         hotel_id = self.kwargs['hotel_id']
-        return Room.objects.filter(hotel_id=hotel_id)
+        rooms = Room.objects.filter(hotel_id=hotel_id)
+        params = self.request.query_params
+        check_in = query_date(params, 'check_in', error=ValidationError)
+        check_out = query_date(params, 'check_out', error=ValidationError)
+        if check_in and check_out:
+            rooms = rooms.available(check_in, check_out, guests=query_count(params, 'guests', error=ValidationError))
+        return rooms
+
+class AvailableRoomListView(FlatListMixin, SerializerPrefetchMixin, KeysetModeMixin, generics.ListAPIView):
+    serializer_class = RoomSerializer
+    permission_classes = [AllowAny]
+    pagination_class = StandardResultsSetPagination
+    keyset_orderings = {
+        'default': ['price_per_night', 'id'],
+        'price_desc': ['-price_per_night', '-id'],
+    }
+
+    def get_queryset(self):
+        params = self.request.query_params
+        check_in = query_date(params, 'check_in', error=ValidationError)
+        check_out = query_date(params, 'check_out', error=ValidationError)
+        if not check_in or not check_out or check_out <= check_in:
+            raise ValidationError("check_in and check_out dates are required, check_out after check_in")
+        return Room.objects.available(
+            check_in, check_out, guests=query_count(params, 'guests', error=ValidationError), city=params.get('city')
+        )
 
-class RoomDetailView(generics.RetrieveAPIView):
+class RoomDetailView(SerializerPrefetchMixin, generics.RetrieveAPIView):
     queryset = Room.objects.all()
     serializer_class = RoomSerializer
     permission_classes = [AllowAny]
 
 # Reservation Management
-class ReservationListView(generics.ListAPIView):
+class ReservationListView(SerializerPrefetchMixin, generics.ListAPIView):
     serializer_class = HotelReservationSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return HotelReservation.objects.filter(user=self.request.user)
+        return HotelReservation.objects.filter(user_id=self.request.user.id).order_by('-reservation_date')
+
+class AutocompleteView(APIView):
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request):
+        scope = request.query_params.get('scope', 'hotel')
+        if scope not in autocomplete.scope_sources():
+            raise ValidationError("scope must be one of hotel, flight or tour")
+        try:
+            limit = min(int(request.query_params.get('limit', autocomplete.DEFAULT_LIMIT)), autocomplete.MAX_LIMIT)
+        except ValueError:
+            limit = autocomplete.DEFAULT_LIMIT
+        places = autocomplete.complete(scope, request.query_params.get('q', ''), limit)
+        return Response([{'value': value, 'label': label, 'count': count} for value, label, count in places])
+
+class TripListView(generics.ListAPIView):
+    serializer_class = TripSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        return trips_for(self.request.user.id)
+
+    def get_keyset_ordering(self):
+        return TRIP_ORDERING
+
+def checkout(request, kind, book):
+    payment_method = request.data.get('payment_method', 'Credit Card')
+    if payment_method not in dict(Payment.PAYMENT_METHODS):
+        raise ValidationError({'payment_method': f"Unknown payment method {payment_method!r}"})
+    try:
+        reservations, replayed = book_and_charge(
+            request.user, kind, book, request.headers.get('Idempotency-Key'), payment_method,
+        )
+    except BookingError as e:
+        raise ValidationError(str(e))
+    if not replayed:
+        notifications.confirm_booking(kind, reservations)
+    return reservations
+
+def id_from(request, name):
+    value = request.data.get(name)
+    try:
+        if isinstance(value, (bool, float)):
+            raise TypeError
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValidationError(f"{name} must be a number")
+
+def party_size_from(request):
+    try:
+        party_size = int(request.data.get('party_size', 1))
+    except (TypeError, ValueError):
+        raise ValidationError("party_size must be a number")
+    if party_size < 1:
+        raise ValidationError("party_size must be at least 1")
+    return party_size
+
+def seat_number_from(request):
+    seat_number = request.data.get('seat_number')
+    if seat_number in (None, ''):
+        return None
+    if not isinstance(seat_number, str) or not LABEL_RE.match(seat_number.strip().upper()):
+        raise ValidationError({'seat_number': "Expected a seat such as 12C."})
+    return seat_number
 
 class ReservationCreateView(generics.CreateAPIView):
     serializer_class = HotelReservationSerializer
     permission_classes = [IsAuthenticated]
     
     def perform_create(self, serializer):
-        room_id = self.request.data.get('room_id')
-        room = Room.objects.get(id=room_id)
-        if not room.is_available:
-            raise serializers.ValidationError("Room is not available")
-        serializer.save(user=self.request.user, room=room)
-        room.is_available = False
-        room.save()
+        room = get_object_or_404(Room, id=id_from(self.request, 'room_id'))
+        data = serializer.validated_data
+        reservations = checkout(
+            self.request, 'hotel', lambda: [book_room(self.request.user, room.id, data['check_in'], data['check_out'])],
+        )
+        serializer.instance = reservations[0]
+
+class FlightReservationCreateView(generics.CreateAPIView):
+    serializer_class = FlightReservationSerializer
+    permission_classes = [IsAuthenticated]
+
+    def create(self, request, *args, **kwargs):
+        flight = get_object_or_404(Flight, id=id_from(request, 'flight_id'))
+        party_size = party_size_from(request)
+        if party_size > 1:
+            book = lambda: book_flight_party(request.user, flight.id, party_size)
+        else:
+            book = lambda: [book_flight(request.user, flight.id, seat_number=seat_number_from(request))]
+        reservations = checkout(request, 'flight', book)
+        serializer = self.get_serializer(reservations, many=True)
+        data = serializer.data if party_size > 1 else serializer.data[0]
+        return Response(data, status=status.HTTP_201_CREATED)
+
+class FlightSeatMapView(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request, pk):
+        flight = get_object_or_404(Flight.objects.only('seat_layout', 'seat_count', 'available_seats', 'seat_map'), pk=pk)
+        seat_map = SeatMap(flight.seat_layout, flight.seat_count, flight.seat_map)
+        return Response({
+            'layout': flight.seat_layout,
+            'seat_count': flight.seat_count,
+            'available_seats': flight.available_seats,
+            'taken': seat_map.taken_labels(),
+        })
+
+class TourReservationCreateView(generics.CreateAPIView):
+    serializer_class = TourReservationSerializer
+    permission_classes = [IsAuthenticated]
+
+    def perform_create(self, serializer):
+        tour = get_object_or_404(Tour, id=id_from(self.request, 'tour_id'))
+        serializer.instance = checkout(self.request, 'tour', lambda: [book_tour(self.request.user, tour.id)])[0]
+
+RESERVATION_SERIALIZERS = {
+    'hotel': HotelReservationSerializer, 'flight': FlightReservationSerializer, 'tour': TourReservationSerializer,
+}
+
+class HoldCreateView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, kind):
+        if kind not in RESERVATION_SERIALIZERS:
+            raise Http404
+        expires = hold_expiry()
+        try:
+            if kind == 'hotel':
+                serializer = HotelReservationSerializer(data=request.data)
+                serializer.is_valid(raise_exception=True)
+                room = get_object_or_404(Room, id=id_from(request, 'room_id'))
+                data = serializer.validated_data
+                reservations = [book_room(request.user, room.id, data['check_in'], data['check_out'], hold_expires_at=expires)]
+            elif kind == 'flight':
+                flight = get_object_or_404(Flight, id=id_from(request, 'flight_id'))
+                party_size = party_size_from(request)
+                if party_size > 1:
+                    reservations = book_flight_party(request.user, flight.id, party_size, hold_expires_at=expires)
+                else:
+                    reservations = [book_flight(
+                        request.user, flight.id, seat_number=seat_number_from(request), hold_expires_at=expires,
+                    )]
+            else:
+                tour = get_object_or_404(Tour, id=id_from(request, 'tour_id'))
+                reservations = [book_tour(request.user, tour.id, hold_expires_at=expires)]
+        except BookingError as e:
+            raise ValidationError(str(e))
+        serializer = RESERVATION_SERIALIZERS[kind](reservations, many=True, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+class HoldConfirmView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, kind):
+        if kind not in RESERVATION_SERIALIZERS:
+            raise Http404
+        ids = request.data.get('reservation_ids')
+        if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids):
+            raise ValidationError({'reservation_ids': "Expected a list of reservation ids."})
+        reservations = checkout(request, kind, lambda: confirm_hold(request.user, kind, ids))
+        serializer = RESERVATION_SERIALIZERS[kind](reservations, many=True, context={'request': request})
+        return Response(serializer.data)
 
 class ReservationCancelView(APIView):
     permission_classes = [IsOwnerOrAdmin]
+    kind = 'hotel'
+
     def post(self, request, id):
-        print(f"Current user: {request.user}, Is authenticated: {request.user.is_authenticated}")
         try:
-            reservation = HotelReservation.objects.get(id=id)
-            print(f"Reservation ID: {id}, Reservation user: {reservation.user}, Room: {reservation.room}")
-        except HotelReservation.DoesNotExist:
+            reservation = RESERVATION_MODELS[self.kind].objects.get(id=id)
+        except ObjectDoesNotExist:
             return Response({'error': 'Reservation not found'}, status=status.HTTP_404_NOT_FOUND)
+        self.check_object_permissions(request, reservation)
         try:
-            reservation.room.is_available = True
-            reservation.room.save()
-            reservation.delete()
+            CANCELLERS[self.kind](reservation)
+            logger.info("User %s cancelled %s reservation %s", request.user.pk, self.kind, id)
             return Response({'message': 'Reservation cancelled'}, status=status.HTTP_200_OK)
         except Exception as e:
+            logger.exception("Cancelling %s reservation %s failed", self.kind, id)
             return Response({'error': f'Failed to cancel reservation: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
             
-class ReservationDetailView(generics.RetrieveAPIView):
+class ReservationDetailView(SerializerPrefetchMixin, generics.RetrieveAPIView):
     queryset = HotelReservation.objects.all()
     serializer_class = HotelReservationSerializer
     permission_classes = [IsOwnerOrAdmin]
\ No newline at end of file